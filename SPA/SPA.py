@@ -1,49 +1,60 @@
 import reflex as rx
 from rxconfig import config
 from .pages.results import result_page
-from state import main  # Your LLM processing function
+from .api import api
+from state import job_queue  # Your LLM processing queue
+from browser_pool import browser_pool
+from resources import registry
+from pricing import inr_rates
+from clean_pool import cleaning_pool
+from metrics import metrics
+from jobs import QueueFullError, QUEUED, CRAWLING, CLEANING, DONE, CANCELLED
+import asyncio
 import re
-import httpx
 import time
-from database import save_user_url, create_table
+import http_client
+from http_client import HostFailures, TTLCache, probe
+from database import save_user_url, url_history
 from urllib.parse import urlparse
 from .components import loader
 
-# ──────────────────────────────────────────────────────────────
-#  Make sure table exists on app start
-# ──────────────────────────────────────────────────────────────
-create_table()
+JOB_STATUS_TEXT = {
+    QUEUED: "Waiting in queue…",
+    CRAWLING: "Crawling…",
+    CLEANING: "Cleaning up the content…",
+}
 
 # ──────────────────────────────────────────────────────────────
 # ✅ Helper function to check if URL is reachable
 # ──────────────────────────────────────────────────────────────
-_checked_url_cache = {}
+# Reachable URLs are trusted for a while; failures are retried soon after
+REACHABLE_TTL = 10 * 60
+UNREACHABLE_TTL = 30
+_checked_url_cache = TTLCache(maxsize=1024)
+_host_failures = HostFailures()
 
 async def check_url_reachable(url: str) -> bool:
-    if url in _checked_url_cache:
-        return _checked_url_cache[url]
+    cached = _checked_url_cache.get(url)
+    if cached is not None:
+        return cached
+    if _host_failures.is_blocked(url):
+        return False
 
     try:
-        async with httpx.AsyncClient(timeout=3.0) as client:
-            response = await client.head(url, follow_redirects=True)
-            if response.status_code == 200:
-                _checked_url_cache[url] = True
-                return True
-            # fallback to GET if HEAD not allowed
-            response = await client.get(url, follow_redirects=True)
-            reachable = response.status_code == 200
-            _checked_url_cache[url] = reachable
-            return reachable
+        # Headers only; the page body is downloaded once, by the job itself
+        reachable = await probe(url, timeout=3.0) == 200
     except Exception:
-        _checked_url_cache[url] = False
-        return False
+        reachable = False
+
+    _host_failures.record(url, reachable)
+    _checked_url_cache.set(url, reachable, REACHABLE_TTL if reachable else UNREACHABLE_TTL)
+    return reachable
 
 # ──────────────────────────────────────────────────────────────
 # ✅ State for toggle (single page vs whole site)
 # ──────────────────────────────────────────────────────────────
 class SwitchState(rx.State):
     value: bool = False
-    show_modal: bool = False
 
     @rx.var
     def mode_text(self) -> str:
@@ -52,13 +63,40 @@ class SwitchState(rx.State):
     @rx.event
     def set_end(self, value: bool):
         self.value = value
-        if value:
-            self.show_modal = True
 
-    @rx.event
-    def close_modal(self):
-        self.value = False
-        self.show_modal = False
+
+# A job whose browser tab has been gone this long is cancelled (reloads reconnect well within it)
+DISCONNECT_GRACE = 15
+
+
+def client_connected(client_token: str) -> bool:
+    namespace = app.event_namespace
+    return namespace is None or client_token in namespace.token_to_sid
+
+
+async def cancel_when_disconnected(job_id: str, client_token: str):
+    """Cancel the job once the tab that started it has been disconnected for DISCONNECT_GRACE seconds."""
+    gone_since = None
+    while True:
+        await asyncio.sleep(1)
+        if client_connected(client_token):
+            gone_since = None
+        elif gone_since is None:
+            gone_since = time.monotonic()
+        elif time.monotonic() - gone_since > DISCONNECT_GRACE:
+            job_queue.cancel(job_id, "Client disconnected")
+            return
+
+
+def format_progress(progress: dict) -> str:
+    """One status line from a jobs.Progress snapshot; empty until there is something to show."""
+    if not progress["pages_fetched"] and not progress["lines_read"]:
+        return ""
+    return (
+        f"{progress['pages_fetched']} pages · {progress['lines_read']:,} lines read · "
+        f"{progress['lines_junk']:,} junk · {progress['lines_duplicate']:,} duplicates · "
+        f"{progress['sections']:,} sections · {progress['tokens']:,} tokens"
+    )
 
 
 # ──────────────────────────────────────────────────────────────
@@ -71,7 +109,11 @@ class State(rx.State):
     show_alert: bool = False
     alert_message: str = ""
     user_id: str = ""
-    start_time: float = 0.0
+    job_id: str = ""
+    job_status: str = ""
+    # Live counters and the latest cleaned sections of the running job
+    job_progress: str = ""
+    job_preview: str = ""
     
     @rx.event
     async def handle_key_press(self, key: str):
@@ -108,10 +150,8 @@ class State(rx.State):
     @rx.event
     async def process_input(self):
         self.is_loading = True  # Show the loader immediately
-        self.start_time = time.time()
 
         url = self.input_text.strip()
-        save_user_url(self.user_id, url)
 
         if not self.is_valid_url:
             self.is_loading = False
@@ -122,10 +162,14 @@ class State(rx.State):
             )
             return
 
+        save_user_url(self.user_id, url)  # Buffered; written in batches off the event loop
         yield  # Let UI update with loader
 
+        check_start = time.perf_counter()
         reachable = await check_url_reachable(url)
+        check_seconds = time.perf_counter() - check_start
         if not reachable:
+            metrics.record("reachability", check_seconds)
             self.is_loading = False
             yield rx.toast(
                 "Website not reachable.",
@@ -135,23 +179,70 @@ class State(rx.State):
             )
             return
 
-        # await main(url)  # Your LLM processing
-        # yield rx.redirect("/results")  # Loader will disappear on route change automatically
-        
+        switch = await self.get_state(SwitchState)
         try:
-            await main(url)  # Your LLM processing
-            yield rx.redirect("/results")  # Loader will disappear on route change automatically
-        except Exception as e:
+            job = job_queue.submit(url, whole_site=switch.value)  # Your LLM processing
+        except QueueFullError as e:
+            metrics.record("reachability", check_seconds)
             self.is_loading = False
             yield rx.toast(
-                "An error occurred while processing the URL.",
-                duration=3000,
+                "Server is busy.",
+                description=str(e),
+                duration=5000,
                 close_button=True,
             )
-            print(f"Error: {e}")  # Log the error for debugging
+            return
 
-        
-      
+        metrics.record("reachability", check_seconds, job.job_id)
+        self.job_id = job.job_id
+        self.job_status = JOB_STATUS_TEXT[job.status]
+        self.job_progress = ""
+        self.job_preview = ""
+        yield State.watch_job
+
+    @rx.event(background=True)
+    async def watch_job(self):
+        """Follow the queued job's progress until it finishes, then show its results."""
+        async with self:
+            job_id = self.job_id
+            client_token = self.router.session.client_token
+        job = None
+        watchdog = asyncio.create_task(cancel_when_disconnected(job_id, client_token))
+        try:
+            async for job, status, position, progress in job_queue.updates(job_id):
+                if job.finished:
+                    break
+                async with self:
+                    self.job_status = JOB_STATUS_TEXT.get(status, "")
+                    if status == QUEUED:
+                        self.job_status += f" (#{position})"
+                    self.job_progress = format_progress(progress)
+                    self.job_preview = progress["preview"]
+        finally:
+            watchdog.cancel()
+
+        if job is not None and job.status == DONE:
+            yield rx.redirect(f"/results/{job.job_id}")  # Loader will disappear on route change automatically
+            return
+
+        async with self:
+            self.is_loading = False
+            self.job_status = ""
+            self.job_progress = ""
+            self.job_preview = ""
+        if job is not None and job.status == CANCELLED:
+            yield rx.toast(
+                "Generation stopped.",
+                description=job.error,
+                duration=5000,
+                close_button=True,
+            )
+            return
+        yield rx.toast(
+            "An error occurred while processing the URL.",
+            duration=3000,
+            close_button=True,
+        )
 
 # ──────────────────────────────────────────────────────────────
 # ✅ App Theme
@@ -201,7 +292,7 @@ def index():
         # ),
 
         
-        loader(State.is_loading),
+        loader(State.is_loading, State.job_status, State.job_progress, State.job_preview),
         
     rx.center(    
         rx.vstack(
@@ -321,7 +412,7 @@ def index():
                             rx.hstack(
                                 rx.switch(
                                     on_change=SwitchState.set_end,
-                                    default_checked=SwitchState.value,  # Just visual, not reactive
+                                    checked=SwitchState.value,
                                 ),
                                 rx.badge(SwitchState.mode_text),
                             ),
@@ -334,97 +425,7 @@ def index():
 
 
                     ),
-                    
-                    rx.cond(
-                        SwitchState.show_modal,
-                        rx.center(
-                            rx.box(
-                                rx.vstack(
-                                    rx.hstack(
-                                        rx.icon(tag="lock", color="#000000", size=22),  # gold star icon
-                                        rx.text("Premium Feature", size="5", weight="bold", color="#000000"),
-                                        spacing="2",  # spacing between icon and text
-                                        align="center",
-                                        justify="center",
-                                    ),
-
-                                    rx.text(
-                                        "This is a premium feature. Contact admin to unlock.",
-                                        size="1",
-                                        color="black",
-                                        text_align="center",
-                                    ),
-                                    rx.hstack(
-                                        rx.button(
-                                            "Contact Admin",
-                                            on_click=rx.redirect("mailto:buildbyfiroz@icloud.com"),
-                                            size="3",
-                                            style={
-                                                "backgroundColor": "#F98147",
-                                                "color": "#fff",
-                                                "fontWeight": "600",
-                                                "borderRadius": "1rem",
-                                                "padding": "1rem 1.5rem",
-                                                "transition": "all 0.3s ease-in-out",
-                                            },
-                                            _hover={
-                                                "backgroundColor": "#e46e35"
-                                            }
-                                        ),
-                                        rx.button(
-                                            "Cancel",
-                                            on_click=SwitchState.close_modal,
-                                            size="3",
-                                            style={
-                                                "width": "50%",
-                                                "backgroundColor": "rgb(220 213 213 / 85%)",
-                                                "color": "#333",
-                                                "fontWeight": "600",
-                                                "borderRadius": "1rem",
-                                                "padding": "1rem 1.5rem",
-                                                "transition": "all 0.3s ease-in-out",
-                                            },
-                                            _hover={
-                                                "backgroundColor": "#f5f5f5"
-                                            }
-                                        ),
-                                        spacing="3",  # ✅ FIXED: use a valid Reflex spacing value between "0"–"9"
-                                        width="100%",
-                                    ),
-                                    spacing="4",
-                                    align="center"
-                                ),
-                                
-                                
-                                style={
-                                    "width": "400px",
-                                    "maxWidth": "90%",
-                                    "padding": "2.5rem",
-                                    "background": "rgba(239, 230, 222, 0.46)",  # ✅ fixed missing closing )
-                                    "borderRadius": "16px",                     # ✅ camelCase and removed ;
-                                    "backdropFilter": "blur(3px)",              # ✅ removed ; and camelCase
-                                    "WebkitBackdropFilter": "blur(3px)",        # ✅ removed ; and camelCase
-                                    "position": "relative",
-                                    "overflow": "hidden",
-                                    "zIndex": "9999",
-                                }
-
-
-                            ),
-                            style={
-                                "position": "fixed",
-                                "top": "0",
-                                "left": "0",
-                                "width": "100vw",
-                                "height": "100vh",
-                                "background": "rgba(0, 0, 0, 0.4)",
-                                "zIndex": "9998"
-                            }
-                        )
-                    ),
 
-                    
-                    
                     style={
                         "position": "relative",
                         "width": "100%",
@@ -570,8 +571,22 @@ app = rx.App(
     stylesheets=[
         "/styles.css",  # This path is relative to assets/
     ],
+    # Extra backend routes (/metrics) next to Reflex's own
+    api_transformer=api,
 )
 
+# Keep warm headless browsers and pooled HTTP connections for the lifetime of the server
+app.register_lifespan_task(browser_pool.lifespan)
+app.register_lifespan_task(http_client.lifespan)
+# Load tokenizers in the background once the server is accepting connections
+app.register_lifespan_task(registry.lifespan)
+# Keep the exchange rate fresh off the request path
+app.register_lifespan_task(inr_rates.lifespan)
+# Stop the cleaning worker processes on shutdown
+app.register_lifespan_task(cleaning_pool.lifespan)
+# Create the URL history table on startup; write out what's still buffered on shutdown
+app.register_lifespan_task(url_history.lifespan)
+
 # Register pages
 app.add_page(index)
 #app.add_page(result_page, route='/results')
@@ -0,0 +1,36 @@
+"""Plain HTTP routes served by the Reflex backend alongside its own."""
+import os
+
+from starlette.applications import Starlette
+from starlette.responses import FileResponse, PlainTextResponse
+from starlette.routing import Route
+
+from metrics import metrics
+from workspace import OUTPUT_FILENAME, is_valid_job_id, job_output_path
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+async def metrics_endpoint(request):
+    """Stage timing histograms for Prometheus to scrape."""
+    return PlainTextResponse(metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+async def download_endpoint(request):
+    """A job's llm.txt, streamed from disk (used for both download and copy)."""
+    job_id = request.path_params["job_id"]
+    path = job_output_path(job_id) if is_valid_job_id(job_id) else None
+    if path is None or not os.path.exists(path):
+        return PlainTextResponse("Output not found.", status_code=404)
+    return FileResponse(path, media_type="text/plain; charset=utf-8", filename=OUTPUT_FILENAME)
+
+
+def download_url(job_id):
+    """Path of download_endpoint for `job_id`, relative to the backend."""
+    return f"/download/{job_id}"
+
+
+api = Starlette(routes=[
+    Route("/metrics", metrics_endpoint),
+    Route("/download/{job_id}", download_endpoint),
+])
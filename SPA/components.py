@@ -2,15 +2,43 @@
 import reflex as rx
 
 
-def loader(is_loading: bool):
+def loader(is_loading: bool, message: str = "", detail: str = "", preview: str | None = None):
+    """Full-screen loader; `detail` and `preview` show a running job's progress."""
+    extras = [rx.text(detail, size="2", color="gray")]
+    if preview is not None:
+        extras.append(
+            rx.cond(
+                preview != "",
+                rx.box(
+                    rx.text(preview, size="1", color="#1e1e1d", style={"whiteSpace": "pre-wrap"}),
+                    style={
+                        "width": "min(640px, 90vw)",
+                        "maxHeight": "30vh",
+                        "overflow": "hidden",
+                        "display": "flex",
+                        "flexDirection": "column",
+                        "justifyContent": "flex-end",  # Newest sections stay in view
+                        "padding": "0.75rem 1rem",
+                        "borderRadius": "12px",
+                        "backgroundColor": "rgba(250,250,250,0.85)",
+                        "fontFamily": "monospace",
+                    },
+                ),
+            )
+        )
     return rx.center(
-        rx.html(
-            """
-            <iframe src="https://lottie.host/embed/c5ea05d5-a299-450c-af25-0ae9c7fc2fba/4DgOchkQ49.lottie "
-                    style="width: 380px; height: 380px; border: none; background: none;" 
-                    allowfullscreen>
-            </iframe>
-            """
+        rx.vstack(
+            rx.html(
+                """
+                <iframe src="https://lottie.host/embed/c5ea05d5-a299-450c-af25-0ae9c7fc2fba/4DgOchkQ49.lottie "
+                        style="width: 380px; height: 380px; border: none; background: none;" 
+                        allowfullscreen>
+                </iframe>
+                """
+            ),
+            rx.text(message, size="3", color="#1e1e1d", weight="medium"),  # Optional status line
+            *extras,
+            align="center",
         ),
         style={
             "position": "fixed",
@@ -1,17 +1,24 @@
 import reflex as rx
-import aiofiles
 from reflex.components.radix.themes.base import (
     LiteralAccentColor,
 )
-import tiktoken
+import asyncio
+import json
 import os
-import requests
 import time
 from millify import millify
+from rxconfig import config
+from ..api import download_url
 from ..components import loader  
+from workspace import is_valid_job_id, job_output_path
+from page_cache import page_cache
+from metrics import metrics
+from analysis import TokenStats, new_stats, stats_path
+from manifest import SectionDiff, load_diff
+from line_index import PAGE_LINES, line_count, read_lines
+from pricing import DEFAULT_MODEL, MODELS, encodings as price_table_encodings, inr_rates
 
 
-now = time.time()
 # ──────────────────────────────────────────────────────────────
 # App Theme Configuration
 # ──────────────────────────────────────────────────────────────
@@ -25,17 +32,10 @@ theme = rx.theme(
 # ──────────────────────────────────────────────────────────────
 # Constants
 # ──────────────────────────────────────────────────────────────
-FILE_PATH = "Output/llm.txt"
 DEFAULT_CONTENT = "⚠️ Output file not found."
-
-USD_COST_PER_1K_TOKENS = 0.01
-INR_CACHE_DURATION = 60 * 60
-INR_FALLBACK_RATE = 83.0
-CURRENCY_API_TIMEOUT = 0.3
-
-_encoding = tiktoken.get_encoding("cl100k_base")
-_cached_inr_rate = INR_FALLBACK_RATE
-_last_inr_fetch = 0
+MODEL_NAMES = list(MODELS)
+# Headings listed per kind of change on the results page
+DIFF_HEADINGS_SHOWN = 5
 
 
 def format_duration(seconds: float) -> str:
@@ -52,47 +52,34 @@ def format_duration(seconds: float) -> str:
 # Helper Functions (place this here)
 # ──────────────────────────────────────────────────────────────
 
-def get_cached_inr_rate():
-    global _cached_inr_rate, _last_inr_fetch
-    
+async def analyze_llm_file(file_path: str) -> TokenStats:
+    """Token and size stats for an llm.txt.
 
-    if now - _last_inr_fetch < INR_CACHE_DURATION:
-        return _cached_inr_rate
-
-    try:
-        response = requests.get(
-            "https://api.exchangerate.host/convert?from=USD&to=INR",
-            timeout=CURRENCY_API_TIMEOUT
-        )
-        data = response.json()
-        _cached_inr_rate = data.get("result", INR_FALLBACK_RATE)
-        _last_inr_fetch = now
-    except:
-        _cached_inr_rate = INR_FALLBACK_RATE
+    Uses the per-section stats the cleaner saved next to the file; only if
+    those are missing, out of date or lack an encoding the price table needs
+    is the file read and tokenized, off the event loop, with every encoding
+    that can be loaded.
+    """
+    needed = price_table_encodings()
+    size = os.path.getsize(file_path)
+    stats = TokenStats.load(stats_path(file_path))
+    if stats is None or stats.bytes != size or not stats.covers(needed):
+        try:
+            stats = await asyncio.to_thread(_count_file_tokens, file_path, needed)
+            stats.save(stats_path(file_path))
+        except Exception as e:
+            print(f"Error: could not count tokens: {e}")
+            stats = TokenStats(needed)
+            stats.sections.append([size] + [0] * len(needed))
+    return stats
 
-    return _cached_inr_rate
-
-def analyze_llm_file(file_path: str) -> dict:
-    now = time.time()  # ⛳ Start timing
 
+def _count_file_tokens(file_path: str, encoding_names) -> TokenStats:
+    stats = new_stats(encoding_names)
+    if stats is None:
+        raise RuntimeError("no tokenizer could be loaded")
     with open(file_path, "r", encoding="utf-8") as f:
-        content = f.read()
-
-    token_count = len(_encoding.encode(content))
-    file_size_bytes = os.path.getsize(file_path)
-    file_size_mb = file_size_bytes / 1024 / 1024
-    usd_cost = (token_count / 1000) * USD_COST_PER_1K_TOKENS
-    inr_cost = usd_cost * get_cached_inr_rate()
-
-    end_time = time.time()
-    analysis_duration_sec = round(end_time - now, 2)
-
-    return {
-        "tokens": millify(token_count, precision=2),
-        "inr_cost": f"{millify(inr_cost, precision=2)}",
-        "file_size_mb": round(file_size_mb, 2),
-        "time_spent": analysis_duration_sec,  # 🟢 Fix the key name
-    }
+        return TokenStats.from_text(f.read(), stats.encodings)
 
 
 # ──────────────────────────────────────────────────────────────
@@ -100,7 +87,11 @@ def analyze_llm_file(file_path: str) -> dict:
 # ──────────────────────────────────────────────────────────────
 class ResultState(rx.State):
     # === Content and Loader ===
+    # Only the visible page of llm.txt lives in state; the whole file is served by SPA.api
     content: str = DEFAULT_CONTENT
+    first_line: int = 1
+    total_lines: int = 0
+    download_url: str = ""
     is_loading: bool = False
     elapsed_time: float = 0.0  # to store time taken in seconds
     # === Card data fields (must be declared before usage) ===
@@ -110,34 +101,135 @@ class ResultState(rx.State):
     # NEW: For tracking time taken
     analysis_time: float = 0.0
     analysis_time_readable: str = "0s"
+    # Model the cost is estimated for, and the costliest section's share of it
+    model: str = DEFAULT_MODEL
+    largest_section_cost: str = ""
+    # Per-section token counts the estimates are priced from (backend only)
+    _token_stats: TokenStats | None = None
+    # Page cache counters, process-wide
+    cache_hits: int = 0
+    cache_misses: int = 0
+    # Seconds per pipeline stage of this job, e.g. "fetch 1.20s · clean 0.30s"
+    stage_times: str = ""
+    # Sections that differ from the last run of the same page, e.g. "1 added · 2 changed · 40 unchanged"
+    section_changes: str = ""
+    changed_headings: str = ""
+
+    @rx.var
+    def last_line(self) -> int:
+        return min(self.first_line + PAGE_LINES - 1, self.total_lines)
 
     @rx.event
     async def load_content(self):
+        render_start = time.perf_counter()
         self.is_loading = True
-        if os.path.exists(FILE_PATH):
-            async with aiofiles.open(FILE_PATH, "r", encoding="utf-8") as f:
-                self.content = await f.read()
-            stats = analyze_llm_file(FILE_PATH)
-            self.tokens = stats["tokens"]  # Already a string (e.g., "1.25k")
-            self.file_size_mb = stats["file_size_mb"]
-            self.inr_cost = stats["inr_cost"]  # Already a string (e.g., "1.04")
-            self.analysis_time = stats["time_spent"]
+        self.cache_hits = page_cache.hits
+        self.cache_misses = page_cache.misses
+        job_id = self.router.page.params.get("job_id", "")
+        file_path = job_output_path(job_id) if is_valid_job_id(job_id) else None
+        if file_path and os.path.exists(file_path):
+            self.download_url = config.api_url + download_url(job_id)
+            await self._show_lines(file_path, 1)
+            now = time.time()  # ⛳ Start timing
+            with metrics.span("analyze", job_id):
+                stats = await analyze_llm_file(file_path)
+            self._token_stats = stats
+            self.file_size_mb = round(stats.bytes / 1024 / 1024, 2)
+            self._update_estimate()
+            self.analysis_time = round(time.time() - now, 2)
             # Format readable time
             if self.analysis_time < 60:
                 self.analysis_time_readable = f"{self.analysis_time:.2f}s"
             else:
                 self.analysis_time_readable = f"{self.analysis_time / 60:.2f} min"
+            metrics.record("render", time.perf_counter() - render_start, job_id)
+            self.stage_times = " · ".join(
+                f"{stage} {seconds:.2f}s" for stage, seconds in metrics.breakdown(job_id).items()
+            )
+            self._show_diff(await asyncio.to_thread(load_diff, file_path))
         else:
             self.content = DEFAULT_CONTENT
+            self.first_line, self.total_lines = 1, 0
+            self.download_url = ""
+            self.stage_times = ""
+            self._show_diff(None)
             print("Content not found. Using default content.")
         self.is_loading = False
 
+    @rx.event
+    async def show_page(self, step: int):
+        """Move the viewer `step` pages forward (or back, if negative)."""
+        job_id = self.router.page.params.get("job_id", "")
+        file_path = job_output_path(job_id) if is_valid_job_id(job_id) else None
+        if file_path and os.path.exists(file_path):
+            await self._show_lines(file_path, self.first_line + step * PAGE_LINES)
+
+    def _show_diff(self, diff: SectionDiff | None):
+        """Summarize the sections changed since the last run of this page, if it was one."""
+        self.section_changes = ""
+        self.changed_headings = ""
+        if diff is None:
+            return
+        self.section_changes = " · ".join([
+            *(f"{len(headings)} {kind}" for kind, headings in
+              (("added", diff.added), ("removed", diff.removed), ("changed", diff.changed)) if headings),
+            f"{diff.unchanged} unchanged",
+        ])
+        headings = diff.added + diff.changed + diff.removed
+        self.changed_headings = ", ".join(headings[:DIFF_HEADINGS_SHOWN]) + (
+            f" and {len(headings) - DIFF_HEADINGS_SHOWN} more" if len(headings) > DIFF_HEADINGS_SHOWN else ""
+        )
+
+    async def _show_lines(self, file_path: str, first_line: int):
+        # Line numbers are 1-based; the first call also builds the line index
+        self.total_lines = await asyncio.to_thread(line_count, file_path)
+        first_line = max(1, min(first_line, self.total_lines - (self.total_lines - 1) % PAGE_LINES))
+        lines = await asyncio.to_thread(read_lines, file_path, first_line - 1, PAGE_LINES)
+        self.first_line = first_line
+        self.content = "\n".join(lines)
+
+    @rx.event
+    def copy_content(self):
+        """Copy the whole llm.txt, fetched by the browser from the download route."""
+        return rx.call_script(
+            f"fetch({json.dumps(self.download_url)})"
+            ".then(response => response.text())"
+            ".then(text => navigator.clipboard.writeText(text))"
+        )
+
+    @rx.event
+    def set_model(self, model: str):
+        """Re-price from the cached token totals; nothing is tokenized again."""
+        if model in MODELS:
+            self.model = model
+            self._update_estimate()
+
+    def _update_estimate(self):
+        stats = self._token_stats
+        if stats is None:
+            return
+        model = self.model if self.model in MODELS else DEFAULT_MODEL
+        if not stats.covers([MODELS[model].encoding]):
+            return  # Its tokenizer couldn't be loaded
+        estimate = stats.estimate(model)
+        rate = inr_rates.rate  # Refreshed in the background, never fetched here
+        self.tokens = millify(estimate.tokens, precision=2)
+        self.inr_cost = f"{millify(estimate.usd * rate, precision=2)}"
+        self.largest_section_cost = ""
+        if len(estimate.section_usd) > 1:
+            largest = max(range(len(estimate.section_usd)), key=estimate.section_usd.__getitem__)
+            self.largest_section_cost = (
+                f"Largest of {len(estimate.section_usd)} sections: "
+                f"₹{estimate.section_usd[largest] * rate:.2f} "
+                f"({millify(estimate.section_tokens[largest], precision=1)} tokens)"
+            )
+
 
 
 # ──────────────────────────────────────────────────────────────
 # UI Components
 # ──────────────────────────────────────────────────────────────
-@rx.page(route="/results", on_load=ResultState.load_content)
+@rx.page(route="/results/[job_id]", on_load=ResultState.load_content)
 def result_page():
     return rx.container(
         rx.fragment(
@@ -224,8 +316,22 @@ def result_page():
                             ),
                            # rx.heading("Estimated Cost"),
                             rx.box(height="0.7rem"),
-                            rx.text("Approximate Embedding Cost ")
-,
+                            rx.hstack(
+                                rx.text("Approximate cost for"),
+                                rx.select(
+                                    MODEL_NAMES,
+                                    value=ResultState.model,
+                                    on_change=ResultState.set_model,
+                                    size="1",
+                                    variant="soft",
+                                ),
+                                spacing="2",
+                                align="center",
+                            ),
+                            rx.cond(
+                                ResultState.largest_section_cost != "",
+                                rx.text(ResultState.largest_section_cost, size="1", color="gray"),
+                            ),
                         ),
                         spacing="2",
                     ),
@@ -259,7 +365,49 @@ def result_page():
                 width="100%",
                 style={"alignItems": "stretch"},
             ),
-            
+
+            # 🔹 Page cache counters
+            rx.hstack(
+                rx.icon("history", size=16),
+                rx.text(
+                    f"Page cache: {ResultState.cache_hits} hits · {ResultState.cache_misses} misses",
+                    size="2",
+                    color="gray",
+                ),
+                spacing="2",
+                align="center",
+                justify="end",
+                style={"marginTop": "1rem"},
+            ),
+
+            # 🔹 Where this job's time went
+            rx.cond(
+                ResultState.stage_times != "",
+                rx.hstack(
+                    rx.icon("timer", size=16),
+                    rx.text(ResultState.stage_times, size="2", color="gray"),
+                    spacing="2",
+                    align="center",
+                    justify="end",
+                ),
+            ),
+
+            # 🔹 What changed since this page was last generated
+            rx.cond(
+                ResultState.section_changes != "",
+                rx.hstack(
+                    rx.icon("git-compare", size=16),
+                    rx.text(f"Since the last run: {ResultState.section_changes} sections", size="2", color="gray"),
+                    rx.cond(
+                        ResultState.changed_headings != "",
+                        rx.text(f"({ResultState.changed_headings})", size="1", color="gray"),
+                    ),
+                    spacing="2",
+                    align="center",
+                    justify="end",
+                ),
+            ),
+
             # 🔹 Main Output Box
             rx.box(
                 rx.box(
@@ -269,7 +417,7 @@ def result_page():
                             rx.button(
                                 rx.icon(tag="copy",style={'width':'80%'}),
                                 on_click=[
-                                    rx.set_clipboard(ResultState.content),
+                                    ResultState.copy_content,
                                     rx.toast(
                                         rx.hstack(
                                             rx.icon(tag="circle_check"),
@@ -303,7 +451,7 @@ def result_page():
                             rx.button(
                                 rx.icon(tag="download",style={'width':'80%'}),
                                 on_click=rx.download(
-                                    data=open(FILE_PATH, "r").read() if os.path.exists(FILE_PATH) else "File not found.",
+                                    url=ResultState.download_url,
                                     filename="llm.txt",
                                 ),
                                 variant="soft",
@@ -342,6 +490,7 @@ def result_page():
                                 ResultState.content,
                                 language="markdown",
                                 show_line_numbers=True,
+                                starting_line_number=ResultState.first_line,
                                 
                                 style={
                                     "background": "transparent !important",
@@ -363,6 +512,38 @@ def result_page():
                             "position": "relative",
                         },
                     ),
+
+                    # 🔹 Pager for the line window shown above
+                    rx.cond(
+                        ResultState.total_lines > PAGE_LINES,
+                        rx.hstack(
+                            rx.icon_button(
+                                rx.icon("chevron-left"),
+                                on_click=ResultState.show_page(-1),
+                                disabled=ResultState.first_line <= 1,
+                                variant="soft",
+                                color_scheme="gray",
+                                size="1",
+                            ),
+                            rx.text(
+                                f"Lines {ResultState.first_line}–{ResultState.last_line} of {ResultState.total_lines}",
+                                size="2",
+                                color="gray",
+                            ),
+                            rx.icon_button(
+                                rx.icon("chevron-right"),
+                                on_click=ResultState.show_page(1),
+                                disabled=ResultState.last_line >= ResultState.total_lines,
+                                variant="soft",
+                                color_scheme="gray",
+                                size="1",
+                            ),
+                            spacing="2",
+                            align="center",
+                            justify="end",
+                            style={"marginTop": "0.5rem"},
+                        ),
+                    ),
                     style={
                         "position": "relative",
                         "width": "100%",
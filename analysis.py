@@ -0,0 +1,195 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict, namedtuple
+
+from cancellation import check_cancelled
+from pricing import MODELS, encodings as price_table_encodings
+from resources import get_encoding
+
+DEFAULT_ENCODING = "cl100k_base"
+STATS_SUFFIX = ".stats.json"
+# Texts longer than this are split on line boundaries and encoded in parallel
+CHUNK_CHARS = 64 * 1024
+# Distinct (encoding, text) counts remembered by the shared TokenCounter
+COUNT_CACHE_SIZE = int(os.getenv("WEB2LLM_TOKEN_CACHE_SIZE", "200000"))
+
+Estimate = namedtuple("Estimate", ["model", "tokens", "usd", "section_tokens", "section_usd"])
+
+
+def stats_path(output_path):
+    """Where the token stats for an llm.txt are kept (next to it)."""
+    return f"{output_path}{STATS_SUFFIX}"
+
+
+def split_chunks(text, size=CHUNK_CHARS):
+    """Split `text` into pieces of about `size` chars, cutting only after newlines."""
+    chunks = []
+    start = 0
+    while len(text) - start > size:
+        cut = text.rfind("\n", start, start + size) + 1
+        if cut <= start:  # One very long line
+            cut = start + size
+        chunks.append(text[start:cut])
+        start = cut
+    chunks.append(text[start:])
+    return chunks
+
+
+class TokenCounter:
+    """Token counts for several encodings, cached by content hash.
+
+    Texts are hashed once and every encoding is looked up against the same
+    hashes, so repeated sections (boilerplate across pages, re-analysed
+    files) are only ever tokenized once per encoding. Misses are encoded
+    together on tiktoken's thread pool.
+    """
+
+    def __init__(self, maxsize=COUNT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._counts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def count(self, texts, encoding_names):
+        """Token counts of each text under each encoding: {encoding: [count, ...]}."""
+        keys = [hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest() for text in texts]
+        result = {}
+        for name in encoding_names:
+            with self._lock:
+                counts = [self._get((name, key)) for key in keys]
+            missing = [i for i, count in enumerate(counts) if count is None]
+            if missing:
+                encoding = get_encoding(name)
+                if len(missing) == 1:
+                    encoded = [encoding.encode_ordinary(texts[missing[0]])]
+                else:
+                    encoded = encoding.encode_ordinary_batch([texts[i] for i in missing])
+                with self._lock:
+                    for i, tokens in zip(missing, encoded):
+                        counts[i] = len(tokens)
+                        self._put((name, keys[i]), counts[i])
+            result[name] = counts
+        return result
+
+    def _get(self, key):
+        count = self._counts.get(key)
+        if count is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._counts.move_to_end(key)
+        return count
+
+    def _put(self, key, count):
+        self._counts[key] = count
+        while len(self._counts) > self.maxsize:
+            self._counts.popitem(last=False)
+
+
+# Shared by every job in the process
+token_counter = TokenCounter()
+
+
+def new_stats(encoding_names=None):
+    """A TokenStats to fill while writing, or None if no tokenizer can be loaded.
+
+    Counts with every encoding the price table needs, so switching models
+    on the results page never has to tokenize again.
+    """
+    available = []
+    for name in encoding_names or price_table_encodings():
+        try:
+            get_encoding(name)
+            available.append(name)
+        except Exception as e:
+            print(f"Error: could not load {name}, its token counts are skipped: {e}")
+    return TokenStats(available) if available else None
+
+
+class TokenStats:
+    """Token and byte counts of an llm.txt, one entry per section written.
+
+    Built by state.SectionWriter while the cleaner writes the file, so the
+    results page can show size and cost without re-reading it. Each section
+    is [bytes, tokens per encoding...] in `encodings` order. Sections are
+    joined by newlines, which count towards `bytes`.
+    """
+
+    def __init__(self, encodings=(DEFAULT_ENCODING,)):
+        self.encodings = list(encodings)
+        self.sections = []
+
+    def add(self, text):
+        """Add one section, counted line by line (plus one token per joining newline).
+
+        Line counts stay in token_counter, where chunker.Chunker picks them up.
+        """
+        check_cancelled()
+        lines = text.split("\n")
+        counts = token_counter.count(lines, self.encodings)
+        size = len(text.encode("utf-8"))
+        self.sections.append([size] + [sum(counts[name]) + len(lines) - 1 for name in self.encodings])
+
+    def add_chunks(self, chunks):
+        """Add one section given as consecutive pieces of its text."""
+        check_cancelled()
+        counts = token_counter.count(chunks, self.encodings)
+        size = sum(len(chunk.encode("utf-8")) for chunk in chunks)
+        self.sections.append([size] + [sum(counts[name]) for name in self.encodings])
+
+    @property
+    def bytes(self):
+        return sum(section[0] for section in self.sections) + max(0, len(self.sections) - 1)
+
+    def section_tokens(self, encoding_name=DEFAULT_ENCODING):
+        column = self.encodings.index(encoding_name) + 1
+        return [section[column] for section in self.sections]
+
+    def tokens(self, encoding_name=DEFAULT_ENCODING):
+        return sum(self.section_tokens(encoding_name))
+
+    def totals(self):
+        """Total tokens per encoding."""
+        return {name: self.tokens(name) for name in self.encodings}
+
+    def covers(self, encoding_names):
+        return all(name in self.encodings for name in encoding_names)
+
+    def estimate(self, model_name):
+        """Per-section and total input cost in USD of the file for `model_name`."""
+        model = MODELS[model_name]
+        section_tokens = self.section_tokens(model.encoding)
+        section_usd = [tokens / 1000 * model.usd_per_1k for tokens in section_tokens]
+        return Estimate(model_name, sum(section_tokens), sum(section_usd), section_tokens, section_usd)
+
+    @classmethod
+    def from_text(cls, text, encoding_names=None):
+        """Stats for a whole file at once, as a single section."""
+        stats = cls(encoding_names or price_table_encodings())
+        stats.add_chunks(split_chunks(text))
+        return stats
+
+    def to_dict(self):
+        return {"encodings": self.encodings, "tokens": self.totals(),
+                "bytes": self.bytes, "sections": self.sections}
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Stats saved at `path`, or None if there are none."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            stats = cls(data["encodings"])
+            stats.sections = data["sections"]
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+        return stats
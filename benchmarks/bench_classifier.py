@@ -0,0 +1,81 @@
+"""Lines/sec for the line classifier versus the old per-term scanning.
+
+Run from the repo root:  python benchmarks/bench_classifier.py [--lines N]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from classifier import (
+    CLASSIFIER, CONTACT_PATTERNS, FILE_EXTENSIONS, IMAGE_TERMS, JUNK_PATTERNS, UI_TERMS,
+)
+
+SAMPLE_PATH = os.path.join("output", "llm.txt")
+
+
+def naive_is_ui_junk(line):
+    """The pre-classifier check: one substring test or re.search per term."""
+    line_lower = line.lower()
+    if any(term in line_lower for term in UI_TERMS):
+        return True
+    if any(re.search(r'\.' + ext, line_lower) for ext in FILE_EXTENSIONS):
+        return True
+    if any(re.search(pattern, line_lower) for pattern in JUNK_PATTERNS):
+        return True
+    return len(line.strip()) < 3
+
+
+def naive_is_contact_line(line):
+    return any(re.search(pattern, line, re.IGNORECASE) for pattern in CONTACT_PATTERNS)
+
+
+def naive_is_image_line(line):
+    return (re.search(r'!\[.*?\]\(.*?\)', line) is not None or
+            any(term in line.lower() for term in IMAGE_TERMS))
+
+
+def naive_classify(line):
+    # The old cleaner ran junk detection again in the image branch and in format_section
+    if naive_is_ui_junk(line):
+        return
+    if naive_is_contact_line(line):
+        return
+    naive_is_image_line(line)
+    naive_is_ui_junk(line)
+    naive_is_ui_junk(line)
+
+
+def load_lines(count):
+    with open(SAMPLE_PATH, "r", encoding="utf-8") as f:
+        sample = [line.strip().strip('"') for line in f if line.strip()]
+    return (sample * (count // len(sample) + 1))[:count]
+
+
+def measure(func, lines):
+    start = time.perf_counter()
+    for line in lines:
+        func(line)
+    return len(lines) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=50_000)
+    args = parser.parse_args()
+
+    lines = load_lines(args.lines)
+    before = measure(naive_classify, lines)
+    after = measure(CLASSIFIER.classify, lines)
+
+    print(f"lines:   {len(lines)}")
+    print(f"before:  {before:,.0f} lines/sec")
+    print(f"after:   {after:,.0f} lines/sec")
+    print(f"speedup: {after / before:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""Throughput, peak memory and dedup work of the cleaning pipeline, fully offline.
+
+Inputs are built from benchmarks/fixtures/sample_page.md (a page in the raw
+markdown form the crawler produces):
+  recorded-N    N lines of pages from the fixture, as a site would repeat its
+                template around partly different content
+  neardup-N     N lines that are mostly small edits of a few hundred sentences,
+                the worst case for fuzzy dedup
+
+Each case runs in its own process so peak RSS is per case. Results can be
+saved as JSON to compare commits.
+
+Run from the repo root:  python benchmarks/bench_cleaning.py [--sizes 1000,10000] [--json out.json]
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from cleaner import (
+    clean_and_restructure_file, format_section, is_contact_line, is_ui_junk, normalize_line,
+)
+from dedup import make_index
+
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "sample_page.md")
+FUNCTIONS = {
+    "is_ui_junk": is_ui_junk,
+    "is_contact_line": is_contact_line,
+    "normalize_line": normalize_line,
+}
+WORDS = ("brand design website mobile app digital marketing growth team project client "
+         "strategy creative service launch product platform custom solution results").split()
+
+
+def recorded_lines(count):
+    """`count` lines of fixture pages; each copy reshuffles the words of a third of its lines."""
+    with open(FIXTURE_PATH, "r", encoding="utf-8") as f:
+        page = f.read().splitlines()
+    rng = random.Random(count)
+    lines = []
+    copy = 0
+    while len(lines) < count:
+        for line in page:
+            words = line.split()
+            if copy and len(words) > 3 and rng.random() < 0.33:
+                rng.shuffle(words)
+                line = " ".join(words)
+            lines.append(line)
+        copy += 1
+    return lines[:count]
+
+
+def neardup_lines(count, sentences=300):
+    """`count` lines, each a base sentence with one to three character edits."""
+    rng = random.Random(count)
+    bases = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 14))) for _ in range(sentences)]
+    lines = []
+    for i in range(count):
+        if i % 50 == 0:
+            lines.append(f"# Section {i // 50}")
+            continue
+        chars = list(rng.choice(bases))
+        for _ in range(rng.randint(1, 3)):
+            chars[rng.randrange(len(chars))] = rng.choice("abcdefghijklmnopqrstuvwxyz ")
+        lines.append("".join(chars))
+    return lines
+
+
+def build_input(name):
+    kind, size = name.rsplit("-", 1)
+    return (recorded_lines if kind == "recorded" else neardup_lines)(int(size))
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_clean(name, index_kind):
+    """clean_and_restructure_file over one input, timed end to end including file I/O."""
+    lines = build_input(name)
+    index = make_index(index_kind)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "llm.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines))
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(open(os.devnull, "w")):
+            clean_and_restructure_file(path, index)
+        seconds = time.perf_counter() - start
+        output_bytes = os.path.getsize(path)
+    return {"seconds": round(seconds, 4), "lines_per_sec": round(len(lines) / seconds),
+            "dedup_comparisons": index.comparisons, "output_bytes": output_bytes}
+
+
+def run_functions(name):
+    """Lines/sec of the per-line helpers, and sections/sec of format_section."""
+    lines = [line.strip() for line in build_input(name) if line.strip()]
+    result = {}
+    for func_name, func in FUNCTIONS.items():
+        start = time.perf_counter()
+        for line in lines:
+            func(line)
+        result[f"{func_name}_lines_per_sec"] = round(len(lines) / (time.perf_counter() - start))
+
+    sections = []
+    title, content = None, []
+    for line in lines:
+        if line.startswith("#"):
+            if title:
+                sections.append((title, content))
+            title, content = line.strip("# "), []
+        else:
+            content.append(line)
+    if title:
+        sections.append((title, content))
+    start = time.perf_counter()
+    for title, content in sections:
+        format_section(title, content)
+    seconds = time.perf_counter() - start
+    result["format_section_sections_per_sec"] = round(len(sections) / seconds)
+    result["format_section_lines_per_sec"] = round(sum(len(c) for _, c in sections) / seconds)
+    return result
+
+
+def run_case(case):
+    """Run one case in this process; `case` is 'clean:<input>:<index>' or 'functions:<input>'."""
+    parts = case.split(":")
+    if parts[0] == "clean":
+        result = run_clean(parts[1], parts[2])
+    else:
+        result = run_functions(parts[1])
+    result["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,100000", help="recorded input sizes, in lines")
+    parser.add_argument("--neardup", type=int, default=10000, help="near-duplicate input size (0 to skip)")
+    parser.add_argument("--index", default="qgram", choices=["qgram", "brute"], help="dedup index to use")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--case", help=argparse.SUPPRESS)  # Internal: run one case in this process
+    args = parser.parse_args()
+
+    if args.case:
+        print(json.dumps(run_case(args.case)))
+        return
+
+    inputs = [f"recorded-{int(size)}" for size in args.sizes.split(",") if size]
+    if args.neardup:
+        inputs.append(f"neardup-{args.neardup}")
+    cases = [f"clean:{name}:{args.index}" for name in inputs]
+    cases.append(f"functions:recorded-{min(int(size) for size in args.sizes.split(',') if size)}")
+
+    results = {}
+    for case in cases:
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--case", case],
+                              cwd=ROOT, capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(f"{case}: failed\n{proc.stderr}", file=sys.stderr)
+            continue
+        results[case] = json.loads(proc.stdout.strip().splitlines()[-1])
+        print(f"{case:32} " + "  ".join(f"{key}={value}" for key, value in results[case].items()))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"commit": git_commit(), "python": platform.python_version(),
+                       "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
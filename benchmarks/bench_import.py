@@ -0,0 +1,83 @@
+"""Import-time guard: how long do the app's modules take to import?
+
+Runs `python -X importtime` in a fresh interpreter for each module and
+reports the cumulative time plus the slowest imports underneath it. Use
+--max-ms to fail (exit 1) when a module gets slower than a budget, e.g.
+because a model is loaded at import again.
+
+Run from the repo root:  python benchmarks/bench_import.py [modules...] [--max-ms N]
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DEFAULT_MODULES = ["state", "SPA.pages.results"]
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)")
+
+
+def measure(module):
+    """Return (cumulative_ms, [(cumulative_ms, name), ...]) for importing `module`."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+
+    imports = []
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        _, cumulative, indent, name = match.groups()
+        imports.append((int(cumulative) / 1000, name))
+        if len(indent) == 1:  # Top-level import
+            total_us += int(cumulative)
+    imports.sort(reverse=True)
+    return total_us / 1000, imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--max-ms", type=float, help="fail if any module takes longer")
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to list")
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    results = {}
+    over_budget = False
+    for module in args.modules:
+        try:
+            total_ms, imports = measure(module)
+        except RuntimeError as e:
+            print(f"{module}: import failed ({e})")
+            results[module] = None
+            over_budget = True
+            continue
+
+        results[module] = {"total_ms": round(total_ms, 1),
+                           "slowest": [[name, round(ms, 1)] for ms, name in imports[:args.top]]}
+        flag = ""
+        if args.max_ms is not None and total_ms > args.max_ms:
+            flag = f"  <-- over {args.max_ms:.0f} ms budget"
+            over_budget = True
+        print(f"{module}: {total_ms:.1f} ms{flag}")
+        for ms, name in imports[:args.top]:
+            print(f"    {ms:9.1f} ms  {name}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
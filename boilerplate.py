@@ -0,0 +1,68 @@
+import hashlib
+import os
+from array import array
+
+# A line on more than this share of a site's pages is treated as template text
+BOILERPLATE_RATIO = float(os.getenv("WEB2LLM_BOILERPLATE_RATIO", "0.5"))
+# Pages seen before anything is judged boilerplate; earlier pages wait for the verdict
+BOILERPLATE_MIN_PAGES = int(os.getenv("WEB2LLM_BOILERPLATE_MIN_PAGES", "5"))
+
+
+class CountMinSketch:
+    """Approximate counts of 64-bit keys in fixed memory.
+
+    Estimates never undercount; they overcount by at most about
+    total / width with probability 1 - 2**-depth.
+    """
+
+    def __init__(self, width=1 << 16, depth=4):
+        self.width = width
+        self.depth = depth
+        self._rows = [array("I", bytes(4 * width)) for _ in range(depth)]
+
+    def _cells(self, key):
+        # One cell per row from successive steps of a 64-bit LCG seeded with the key
+        for row in range(self.depth):
+            key = (key * 6364136223846793005 + 1442695040888963407) & 0xFFFFFFFFFFFFFFFF
+            yield row, (key >> 32) % self.width
+
+    def add(self, key, count=1):
+        for row, cell in self._cells(key):
+            self._rows[row][cell] += count
+
+    def estimate(self, key):
+        return min(self._rows[row][cell] for row, cell in self._cells(key))
+
+
+def fingerprint(normalized):
+    """64-bit fingerprint of a normalized line."""
+    return int.from_bytes(hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class BoilerplateModel:
+    """Site-level model of which lines are template text (nav, footers, CTAs).
+
+    Counts, per fingerprint, how many pages a line appears on. Lines that
+    appear on more than `ratio` of the pages seen so far are boilerplate.
+    Memory stays fixed however many pages are crawled.
+    """
+
+    def __init__(self, ratio=BOILERPLATE_RATIO, min_pages=BOILERPLATE_MIN_PAGES, sketch=None):
+        self.ratio = ratio
+        self.min_pages = min_pages
+        self.sketch = sketch or CountMinSketch()
+        self.pages = 0
+        self.lines_removed = 0
+
+    @property
+    def ready(self):
+        return self.pages >= self.min_pages
+
+    def observe(self, fingerprints):
+        """Count one page, given the fingerprints of its lines."""
+        for key in set(fingerprints):
+            self.sketch.add(key)
+        self.pages += 1
+
+    def is_boilerplate(self, key):
+        return self.ready and self.sketch.estimate(key) > self.ratio * self.pages
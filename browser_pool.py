@@ -0,0 +1,156 @@
+import asyncio
+import contextlib
+import os
+import time
+
+try:
+    from crawl4ai import AsyncWebCrawler, BrowserConfig, CacheMode, CrawlerRunConfig
+except ImportError:  # Pool is optional; state.fetch_page falls back to xengine
+    AsyncWebCrawler = None
+
+POOL_ENABLED = os.getenv("WEB2LLM_BROWSER_POOL", "1") != "0"
+POOL_SIZE = int(os.getenv("WEB2LLM_BROWSERS", "2"))
+# Recycle a browser after this many pages to cap leaked memory in long-lived Chromium
+MAX_PAGES_PER_BROWSER = int(os.getenv("WEB2LLM_MAX_PAGES_PER_BROWSER", "50"))
+PAGE_TIMEOUT_MS = 60_000
+
+
+class PooledBrowser:
+    """A started AsyncWebCrawler plus the bookkeeping the pool needs."""
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+        self.pages_served = 0
+        self.started_at = time.time()
+
+    def is_healthy(self):
+        if not getattr(self.crawler, "ready", True):
+            return False
+        manager = getattr(getattr(self.crawler, "crawler_strategy", None), "browser_manager", None)
+        browser = getattr(manager, "browser", None)
+        return browser is None or browser.is_connected()
+
+
+class BrowserPool:
+    """Process-wide pool of warm headless browsers shared by all jobs.
+
+    Each browser is checked out by one render at a time. Browsers are
+    replaced when they fail a health check or have served
+    `max_pages_per_browser` pages.
+    """
+
+    def __init__(self, size=POOL_SIZE, max_pages_per_browser=MAX_PAGES_PER_BROWSER, factory=None):
+        self.size = size
+        self.max_pages_per_browser = max_pages_per_browser
+        # factory() returns an un-started crawler; injectable for tests and custom configs
+        self.factory = factory or _default_crawler
+        self.launches = 0
+        self.reuses = 0
+        self.launch_seconds = 0.0
+        self._idle = []
+        self._slots = None
+        self._all = set()
+
+    @property
+    def available(self):
+        return POOL_ENABLED and AsyncWebCrawler is not None
+
+    async def start(self):
+        """Launch browsers up front so the first jobs don't pay for cold starts."""
+        self._ensure_slots()
+        browsers = [await self._launch() for _ in range(self.size - len(self._all))]
+        self._idle.extend(browsers)
+
+    async def close(self):
+        for browser in list(self._all):
+            await self._retire(browser)
+        self._idle.clear()
+
+    @contextlib.asynccontextmanager
+    async def lifespan(self):
+        """App lifespan hook: warm the pool on startup, close it on shutdown."""
+        if self.available:
+            try:
+                await self.start()
+            except Exception as e:
+                print(f"Error: could not pre-launch browsers: {e}")
+        try:
+            yield
+        finally:
+            await self.close()
+
+    @contextlib.asynccontextmanager
+    async def browser(self):
+        """Check out a healthy crawler for the duration of the block."""
+        self._ensure_slots()
+        async with self._slots:
+            pooled = await self._checkout()
+            interrupted = False
+            try:
+                yield pooled.crawler
+            except asyncio.CancelledError:
+                # Stopped mid-page; the browser may still be loading it, so don't reuse it
+                interrupted = True
+                raise
+            finally:
+                pooled.pages_served += 1
+                if not interrupted and pooled.is_healthy() and pooled.pages_served < self.max_pages_per_browser:
+                    self._idle.append(pooled)
+                else:
+                    await self._retire(pooled)
+
+    async def render(self, url, crawler=None):
+        """Return the markdown for `url`, on `crawler` if given, else on a pooled one."""
+        if crawler is not None:
+            return await _crawl(crawler, url)
+        async with self.browser() as pooled:
+            return await _crawl(pooled, url)
+
+    def _ensure_slots(self):
+        # Created lazily so it binds to the server's event loop
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.size)
+
+    async def _checkout(self):
+        while self._idle:
+            pooled = self._idle.pop()
+            if pooled.is_healthy():
+                self.reuses += 1
+                return pooled
+            await self._retire(pooled)
+        return await self._launch()
+
+    async def _launch(self):
+        start = time.perf_counter()
+        crawler = self.factory()
+        await crawler.start()
+        self.launch_seconds += time.perf_counter() - start
+        self.launches += 1
+        pooled = PooledBrowser(crawler)
+        self._all.add(pooled)
+        return pooled
+
+    async def _retire(self, pooled):
+        self._all.discard(pooled)
+        try:
+            await pooled.crawler.close()
+        except Exception as e:
+            print(f"Error: failed to close browser: {e}")
+
+
+def _default_crawler():
+    return AsyncWebCrawler(config=BrowserConfig(headless=True, verbose=False))
+
+
+async def _crawl(crawler, url):
+    config = None
+    if AsyncWebCrawler is not None:
+        config = CrawlerRunConfig(cache_mode=CacheMode.BYPASS, page_timeout=PAGE_TIMEOUT_MS)
+    result = await crawler.arun(url=url, config=config)
+    if not result.success:
+        raise RuntimeError(result.error_message or f"Failed to render {url}")
+    return str(result.markdown or "")
+
+
+# Shared by every job in the process
+browser_pool = BrowserPool()
@@ -0,0 +1,67 @@
+import asyncio
+import contextvars
+import threading
+
+
+class Cancelled(Exception):
+    """Raised inside a generation whose CancelToken has been cancelled."""
+
+
+class CancelToken:
+    """Cancellation flag for one generation, safe to check from any thread.
+
+    Async code is stopped by cancelling its task; code running in worker
+    threads (the cleaner, token counting) can't be, so it polls the token
+    through check_cancelled() instead.
+    """
+
+    def __init__(self):
+        self.reason = ""
+        self._event = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self, reason="Cancelled"):
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    def check(self):
+        if self._event.is_set():
+            raise Cancelled(self.reason)
+
+
+# Token of the generation the current task/thread works for; asyncio.to_thread and new tasks inherit it
+current_token = contextvars.ContextVar("current_token", default=None)
+
+
+def check_cancelled():
+    """Raise Cancelled if the generation this code runs for has been cancelled."""
+    token = current_token.get()
+    if token is not None:
+        token.check()
+
+
+def cancel_current(reason="Cancelled"):
+    """Cancel the generation this code runs for, so its leftover threads stop too.
+
+    A reason it was already cancelled for (a timeout, the user) is kept.
+    """
+    token = current_token.get()
+    if token is not None:
+        token.cancel(reason)
+
+
+async def await_with_timeout(task, token, timeout):
+    """Await `task`; after `timeout` seconds cancel `token`, then the task.
+
+    The token gets its reason before the task sees CancelledError, so it is
+    the timeout that gets reported, not the cancellation it causes.
+    """
+    done, _ = await asyncio.wait({task}, timeout=timeout)
+    if not done:
+        token.cancel(f"Timed out after {timeout:g}s")
+        task.cancel()
+    return await task
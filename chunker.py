@@ -0,0 +1,134 @@
+import json
+import os
+
+from analysis import DEFAULT_ENCODING, token_counter
+from cancellation import check_cancelled
+from resources import get_encoding
+
+CHUNK_TOKENS = int(os.getenv("WEB2LLM_CHUNK_TOKENS", "512"))
+CHUNK_OVERLAP = int(os.getenv("WEB2LLM_CHUNK_OVERLAP", "64"))
+CHUNKS_SUFFIX = ".chunks.jsonl"
+
+
+def chunks_path(output_path):
+    """Where the RAG chunks for an llm.txt are written (llm.txt -> llm.chunks.jsonl)."""
+    return f"{os.path.splitext(output_path)[0]}{CHUNKS_SUFFIX}"
+
+
+def section_title(line):
+    """Title of a formatted section from its first line ('"# Title"'), else None."""
+    if line.startswith('"# ') and line.endswith('"'):
+        return line[3:-1]
+    return None
+
+
+class Chunker:
+    """Splits formatted sections into token-bounded chunks written as JSONL.
+
+    Chunks never cross a section (heading) boundary. Consecutive chunks of a
+    section repeat up to `overlap` tokens of trailing lines. A single line
+    longer than `max_tokens` becomes a chunk of its own. Token counts come
+    from analysis.token_counter, which already holds every line counted by
+    TokenStats while the section was written, so nothing is encoded twice.
+
+    Each record has the source URL, the section path, the token count and
+    the [start, end) byte offsets of its text in llm.txt.
+    """
+
+    def __init__(self, f, source=None, max_tokens=CHUNK_TOKENS, overlap=CHUNK_OVERLAP,
+                 encoding_name=DEFAULT_ENCODING):
+        if not 0 <= overlap < max_tokens:
+            raise ValueError("overlap must be smaller than max_tokens")
+        self.f = f
+        self.source = source
+        self.max_tokens = max_tokens
+        self.overlap = overlap
+        self.encoding_name = encoding_name
+        self.chunks = 0
+
+    def add(self, section, offset, source=None):
+        """Chunk one section that starts at byte `offset` of llm.txt."""
+        lines = section.split("\n")
+        title = section_title(lines[0])
+        if title is None:  # Spacer lines between sections
+            return
+        tokens = token_counter.count(lines, [self.encoding_name])[self.encoding_name]
+        starts = []
+        for line in lines:
+            starts.append(offset)
+            offset += len(line.encode("utf-8")) + 1
+
+        def span(i, j):  # Tokens in lines[i:j], one per joining newline
+            return sum(tokens[i:j]) + (j - i - 1)
+
+        i = 0
+        while i < len(lines):
+            j = i + 1
+            while j < len(lines) and span(i, j + 1) <= self.max_tokens:
+                j += 1
+            self._emit(source or self.source, title, lines, starts, i, j, span(i, j))
+            if j == len(lines):
+                break
+            # Carry trailing lines into the next chunk, leaving room for line j
+            k = j
+            while k - 1 > i and span(k - 1, j) <= self.overlap:
+                k -= 1
+            while k < j and span(k, j + 1) > self.max_tokens:
+                k += 1
+            i = k
+
+    def _emit(self, source, title, lines, starts, i, j, tokens):
+        self.f.write(json.dumps({
+            "id": self.chunks,
+            "source": source,
+            "section_path": [title],
+            "tokens": tokens,
+            "start": starts[i],
+            "end": starts[j - 1] + len(lines[j - 1].encode("utf-8")),
+            "text": "\n".join(lines[i:j]),
+        }, ensure_ascii=False))
+        self.f.write("\n")
+        self.chunks += 1
+
+
+def split_sections(text):
+    """(section, byte offset) pairs of an llm.txt written by state.SectionWriter."""
+    sections = []
+    current = []
+    offset = start = 0
+    for line in text.split("\n"):
+        if section_title(line) is not None:
+            # A section never ends with a spacer, so a trailing one separates sections
+            if current and current[-1] == '""':
+                current.pop()
+            if current:
+                sections.append(("\n".join(current), start))
+            current, start = [], offset
+        current.append(line)
+        offset += len(line.encode("utf-8")) + 1
+    if current:
+        sections.append(("\n".join(current), start))
+    return sections
+
+
+def chunk_file(output_path, source=None, encoding_name=DEFAULT_ENCODING):
+    """Write the chunks for an existing llm.txt, e.g. one restored from the page cache.
+
+    Returns the number of chunks written (0 if the tokenizer is unavailable).
+    """
+    try:
+        get_encoding(encoding_name)
+    except Exception as e:
+        print(f"Error: chunks skipped, could not load {encoding_name}: {e}")
+        return 0
+    with open(output_path, "r", encoding="utf-8") as f:
+        text = f.read()
+    path = chunks_path(output_path)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        chunker = Chunker(f, source, encoding_name=encoding_name)
+        for section, offset in split_sections(text):
+            check_cancelled()
+            chunker.add(section, offset)
+    os.replace(tmp_path, path)
+    return chunker.chunks
@@ -0,0 +1,155 @@
+import re
+from collections import namedtuple
+
+# Common UI/icon terms (matched as plain substrings of the lowercased line)
+UI_TERMS = [
+    'icon', 'avatar', 'logo', 'button', 'nav', 'navbar', 'menu',
+    'hamburger', 'dropdown', 'toggle', 'footer', 'header', 'banner',
+    'sidebar', 'widget', 'chatbot', 'cookie', 'notification', 'alert',
+    'tooltip', 'badge', 'card', 'carousel', 'slider', 'modal', 'popup',
+    'tab', 'accordion', 'breadcrumb', 'pagination', 'loader', 'spinner',
+    'progress', 'checkbox', 'radio', 'switch', 'input', 'textarea',
+    'select', 'form', 'label', 'field', 'close', 'minimize', 'maximize',
+    'expand', 'collapse', 'zoom', 'scroll', 'drag', 'drop', 'overlay',
+    'backdrop', 'splash', 'placeholder', 'toolbar', 'ribbon', 'fab',
+    'stepper', 'chip', 'divider', 'snackbar', 'toast', 'dialog'
+]
+
+# File extensions to exclude
+FILE_EXTENSIONS = [
+    'svg', 'gif', 'ico', 'bmp', 'tiff', 'eps', 'ai', 'psd',
+    'jpg', 'jpeg', 'png', 'webp', 'avif', 'heic', 'raw', 'cr2',
+    'mp4', 'mov', 'avi', 'mkv', 'flv', 'wmv', 'mpeg', '3gp',
+    'mp3', 'wav', 'aac', 'ogg', 'flac', 'm4a', 'wma', 'amr',
+    'pdf', 'docx', 'xlsx', 'pptx', 'odt', 'rtf', 'tex', 'csv',
+    'ttf', 'otf', 'woff', 'woff2', 'eot', 'fon', 'fnt',
+    'zip', 'rar', '7z', 'tar', 'gz', 'bz2', 'xz',
+    'exe', 'dll', 'msi', 'bat', 'cmd', 'sh', 'pyc',
+    'db', 'sqlite', 'sql', 'bak', 'log', 'tmp', 'swp',
+    'torrent', 'iso', 'img', 'vmdk', 'vdi', 'ova', 'apk',
+    'ipa', 'jar', 'class', 'java', 'cs', 'vb', 'rb',
+    'php', 'asp', 'jsp', 'aspx', 'cgi', 'pl', 'lua'
+]
+
+# Patterns that indicate non-content elements
+JUNK_PATTERNS = [
+    r'\b\d+x\d+\b',  # Image dimensions (e.g., 100x100)
+    r'\b\d+px\b',    # Pixel sizes
+    r'#[0-9a-f]{3,6}',  # Hex colors
+    r'\b(rgb|rgba|hsl|hsla)\([^)]+\)',  # Color functions
+    r'\b(click|tap|hover|press|select|swipe|pinch)\b',
+    r'\b(loading|spinner|progress)\b',
+    r'©\s*\d{4}',  # Copyright
+    r'all rights reserved',
+    r'terms of service|privacy policy',
+    r'cookie consent',
+    r'[\u25A0-\u25FF\u2600-\u26FF\u2700-\u27BF]'  # Common Unicode symbols/icons
+]
+
+CONTACT_PATTERNS = [
+    r'email\s*:',
+    r'phone\s*:',
+    r'mobile\s*:',
+    r'tel:',
+    r'address\s*:',
+    r'http[s]?://',
+    r'\b(contact|connect|reach|follow)\b',
+    r'linkedin\.com|facebook\.com|instagram\.com|twitter\.com',
+    r'github\.com|youtube\.com|whatsapp|telegram',
+    r'\b[\w\.-]+@[\w\.-]+\.\w+\b'  # Email regex
+]
+
+IMAGE_TERMS = ['image:', 'img:', 'picture:', 'photo:']
+
+# Line kinds, in the order the cleaner checks them
+JUNK = "junk"
+CONTACT = "contact"
+IMAGE = "image"
+HEADING = "heading"
+CONTENT = "content"
+
+Classification = namedtuple("Classification", ["kind", "image"])
+
+
+def _alternation(patterns):
+    return "|".join(f"(?:{p})" for p in patterns)
+
+
+def _trie_pattern(words):
+    """Regex matching any of `words`, factored by shared prefixes.
+
+    A flat "a|b|c" alternation makes the regex engine retry every word at
+    every position; a prefix trie lets it drop out after one character.
+    """
+    root = {}
+    for word in words:
+        node = root
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node):
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(root)
+
+
+class LineClassifier:
+    """Classifies cleaner input lines with a handful of precompiled regexes.
+
+    Every term list above is folded into one compiled pattern so a line is
+    scanned once per question instead of once per term.
+    """
+
+    def __init__(self, ui_terms=UI_TERMS, file_extensions=FILE_EXTENSIONS,
+                 junk_patterns=JUNK_PATTERNS, contact_patterns=CONTACT_PATTERNS,
+                 image_terms=IMAGE_TERMS):
+        self._junk_terms = re.compile(
+            _trie_pattern(ui_terms) + r'|\.' + _trie_pattern(file_extensions)
+        )
+        self._junk_patterns = re.compile(_alternation(junk_patterns))
+        self._contact = re.compile(_alternation(contact_patterns), re.IGNORECASE)
+        self._image_markdown = re.compile(r'!\[.*?\]\(.*?\)')
+        self._image_terms = re.compile(_alternation(re.escape(t) for t in image_terms))
+        self._heading = re.compile(r'^#+\s+')
+
+    def is_junk(self, line):
+        if len(line.strip()) < 3:
+            return True
+        line_lower = line.lower()
+        return (self._junk_terms.search(line_lower) is not None
+                or self._junk_patterns.search(line_lower) is not None)
+
+    def is_contact(self, line):
+        return self._contact.search(line) is not None
+
+    def is_image(self, line):
+        return (self._image_markdown.search(line) is not None
+                or self._image_terms.search(line.lower()) is not None)
+
+    def is_heading(self, line):
+        return self._heading.search(line) is not None
+
+    def classify(self, line):
+        """Return the Classification for a stripped line.
+
+        `image` is also set for contact lines carrying image markdown, since
+        those are kept and still need spacing after them.
+        """
+        if self.is_junk(line):
+            return Classification(JUNK, False)
+        if self.is_contact(line):
+            return Classification(CONTACT, self.is_image(line))
+        if self.is_image(line):
+            return Classification(IMAGE, True)
+        if self.is_heading(line):
+            return Classification(HEADING, False)
+        return Classification(CONTENT, False)
+
+
+# Shared instance, compiled once at import
+CLASSIFIER = LineClassifier()
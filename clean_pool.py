@@ -0,0 +1,162 @@
+import asyncio
+import contextlib
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from boilerplate import fingerprint
+from cancellation import check_cancelled
+from classifier import CLASSIFIER
+from cleaner import prepare_line
+from metrics import metrics
+
+# Worker processes for the per-line cleaning work of multi-page jobs (1 = use a thread)
+CLEAN_WORKERS = int(os.getenv("WEB2LLM_CLEAN_WORKERS", str(os.cpu_count() or 1)))
+
+
+def _mp_context():
+    # Forking the server, which already runs threads (the event loop's executor,
+    # the url-history writer, tiktoken), can deadlock the children, so workers
+    # start from a fresh interpreter. The forkserver imports this module once
+    # and every worker is forked from it with the cleaner already loaded.
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+def _init_worker():
+    # The classifier's patterns are compiled at import; run it once so the
+    # first real page doesn't pay for any lazy regex setup either
+    CLASSIFIER.classify("Warm up the classifier")
+
+
+def prepare_page(markdown):
+    """Run prepare_line() over every line of a page (in a worker process).
+
+    Returns the page's line count and its prepared lines; dropped lines are left out.
+    """
+    lines = markdown.splitlines()
+    return len(lines), [prepared for prepared in map(prepare_line, lines) if prepared is not None]
+
+
+class CleaningPool:
+    """Process pool that does the stateless cleaning of pages in parallel.
+
+    Classification, normalization and contact splitting are pure per-line
+    regex work, so they can run on every core. Deduplication depends on
+    everything seen before, so it stays in the job's own
+    cleaner.StreamingCleaner and is applied in page order (see PageMerger).
+    """
+
+    def __init__(self, workers=CLEAN_WORKERS):
+        self.workers = workers
+        self._executor = None
+
+    def _get_executor(self):
+        # Started lazily so importing the app doesn't start workers
+        if self._executor is None and self.workers > 1:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=_mp_context(),
+                                                 initializer=_init_worker)
+        return self._executor
+
+    def submit(self, markdown):
+        """Start preparing a page; returns an awaitable of prepare_page()'s result."""
+        executor = self._get_executor()
+        if executor is None:
+            return asyncio.ensure_future(asyncio.to_thread(prepare_page, markdown))
+        return asyncio.get_running_loop().run_in_executor(executor, prepare_page, markdown)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    @contextlib.asynccontextmanager
+    async def lifespan(self):
+        """App lifespan hook: stop the worker processes on shutdown."""
+        try:
+            yield
+        finally:
+            self.close()
+
+
+class PageMerger:
+    """Feeds prepared pages into one StreamingCleaner in the order they were submitted.
+
+    Pages finish preparing in any order; merge() returns the sections of
+    every page at the head of the queue that is ready, so output doesn't
+    depend on which worker was fastest.
+
+    With a boilerplate.BoilerplateModel, every page is counted into it and
+    lines it considers site-wide template text are dropped before dedup.
+    The first pages are held back until the model has seen enough pages to
+    judge them too.
+    """
+
+    def __init__(self, cleaner, pool, boilerplate=None):
+        self.cleaner = cleaner
+        self.pool = pool
+        self.boilerplate = boilerplate
+        self._pending = deque()
+        self._held = []
+
+    def submit(self, markdown, source=None):
+        self._pending.append((source, self.pool.submit(markdown)))
+
+    async def merge(self, wait=False):
+        """(section, source) pairs for the ready pages; with `wait`, for all of them."""
+        merged = []
+        while self._pending and (wait or self._pending[0][1].done()):
+            source, future = self._pending.popleft()
+            lines_read, prepared = await future
+            self.cleaner.lines_read += lines_read
+            self.cleaner.lines_junk += lines_read - len(prepared)
+            if self.boilerplate is not None:
+                keys = [line_fingerprint(line) for line in prepared]
+                self.boilerplate.observe(keys)
+                self._held.append((source, prepared, keys))
+            else:
+                self._held.append((source, prepared, None))
+            if self.boilerplate is None or self.boilerplate.ready or (wait and not self._pending):
+                for source, prepared, keys in self._held:
+                    with metrics.span("clean"):
+                        sections = await asyncio.to_thread(merge_page, self.cleaner, prepared,
+                                                           self.boilerplate, keys)
+                    merged.extend((section, source) for section in sections)
+                self._held = []
+        return merged
+
+    def cancel(self):
+        for _, future in self._pending:
+            future.cancel()
+        self._pending.clear()
+        self._held = []
+
+
+def line_fingerprint(prepared):
+    return fingerprint(prepared.normalized if prepared.normalized is not None else prepared.line)
+
+
+def merge_page(cleaner, prepared, boilerplate=None, keys=None):
+    """Dedup and assemble one prepared page; returns its sections.
+
+    Lines whose fingerprint in `keys` is boilerplate are dropped first.
+    """
+    check_cancelled()
+    if boilerplate is not None:
+        kept = [line for line, key in zip(prepared, keys) if not boilerplate.is_boilerplate(key)]
+        boilerplate.lines_removed += len(prepared) - len(kept)
+        prepared = kept
+    sections = [section for section in map(cleaner.feed_prepared, prepared) if section is not None]
+    # A page's last section shouldn't swallow the next page's leading content
+    last = cleaner.finish()
+    if last is not None:
+        sections.append(last)
+    return sections
+
+
+# Shared by every job in the process
+cleaning_pool = CleaningPool()
@@ -0,0 +1,530 @@
+import os
+import re
+import time
+from collections import deque, namedtuple
+
+from analysis import new_stats, stats_path
+from cancellation import check_cancelled
+from chunker import Chunker, chunks_path
+from classifier import CLASSIFIER, JUNK, CONTACT, IMAGE, HEADING
+from dedup import make_index
+from manifest import PreviousOutput, diff_sections, iter_segments, manifest_path, new_entry, save_manifest
+from metrics import metrics
+
+# Sections kept by SectionWriter for previews
+PREVIEW_SECTIONS = 20
+
+def normalize_line(line):
+    """Normalize a line by lowercasing, removing links, and collapsing spaces."""
+    line = re.sub(r'\[([^\]]+)\]\([^)]+\)', r'\1', line)
+    line = re.sub(r'[^\w\s]', '', line.lower()).strip()
+    return line
+
+def is_image_line(line):
+    """Check if line contains an image markdown or image-related content."""
+    return CLASSIFIER.is_image(line)
+
+def is_ui_junk(line):
+    """Check if line contains UI elements, icons, or non-content elements."""
+    return CLASSIFIER.is_junk(line)
+
+def is_contact_line(line):
+    """Check if line contains contact information."""
+    return CLASSIFIER.is_contact(line)
+
+def needs_newline_after(current_line, next_line):
+    """Determine if we need a newline after current line."""
+    if is_image_line(current_line):
+        return True
+    if current_line.startswith('#') and not next_line.startswith('#'):
+        return True
+    if ('address' in current_line.lower() and 
+        any(x in next_line.lower() for x in ['phone', 'mobile', 'email'])):
+        return True
+    return False
+
+def split_contact_lines(line):
+    """Split combined contact information into separate lines."""
+    # Split different contact info types
+    line = re.sub(r'([^\s])(Email\s*:)', r'\1\n\2', line, flags=re.IGNORECASE)
+    line = re.sub(r'(Email\s*:[^\n]+)(http[s]?://)', r'\1\n\2', line, flags=re.IGNORECASE)
+    line = re.sub(r'(\bPhone\b[^\n]+)(\bMobile\b)', r'\1\n\2', line, flags=re.IGNORECASE)
+    line = re.sub(r'(\bAddress\b[^\n]+)(\bEmail\b)', r'\1\n\2', line, flags=re.IGNORECASE)
+    
+    # Split multiple URLs
+    line = re.sub(r'(https?://[^\s]+)\s+(https?://)', r'\1\n\2', line)
+    
+    return line
+
+PreparedLine = namedtuple("PreparedLine", ["line", "info", "normalized", "parts"])
+
+
+def prepare_line(line):
+    """The stateless part of cleaning one line: classify, normalize, split contacts.
+
+    Returns None for lines that are dropped whatever came before them (empty,
+    junk, images). For contact lines `parts` holds a (line, classification,
+    normalized) triple per contact item.
+    """
+    line = line.strip()
+
+    # Skip empty or junk lines
+    if not line:
+        return None
+    info = CLASSIFIER.classify(line)
+    if info.kind == JUNK:
+        return None
+
+    if info.kind == CONTACT:
+        parts = []
+        for sub_line in split_contact_lines(line).split('\n'):
+            sub_line = sub_line.strip()
+            if not sub_line:
+                continue
+            sub_info = info if sub_line == line else CLASSIFIER.classify(sub_line)
+            if sub_info.kind == JUNK:
+                continue
+            parts.append((sub_line, sub_info, normalize_line(sub_line)))
+        return PreparedLine(line, info, None, parts)
+
+    # Skip images and non-content elements
+    if info.kind == IMAGE:
+        return None
+
+    return PreparedLine(line, info, normalize_line(line), None)
+
+
+class SeenLines:
+    """Normalized lines, looked up the way the cleaner deduplicates.
+
+    Contact lines are only ever matched exactly; every other line is also
+    checked against `near_index` for near duplicates.
+    """
+
+    def __init__(self, near_index):
+        self.exact = set()
+        self.near = near_index
+
+    def add(self, normalized, fuzzy=True):
+        self.exact.add(normalized)
+        if fuzzy:
+            self.near.add(normalized)
+
+    def contains(self, normalized, fuzzy=True):
+        return normalized in self.exact or (fuzzy and self.near.contains_similar(normalized))
+
+
+class StreamingCleaner:
+    """Push-style cleaner: feed raw lines in, get finished sections out.
+
+    Only the section being assembled is kept in memory (plus the dedup
+    state), so sections can be written or shown while lines are still
+    arriving from the crawler.
+    """
+
+    def __init__(self, dedup_index=None):
+        self.seen_exact = set()
+        self.near_duplicates = dedup_index if dedup_index is not None else make_index()
+        self.dedup_seconds = 0.0
+        # Progress counters, read by jobs.Progress while a job runs
+        self.lines_read = 0
+        self.lines_junk = 0
+        self.lines_duplicate = 0
+        self.sections_opened = 0
+        # Lines of the open section dropped as duplicates, and the contact lines it kept
+        # (normalized); moved to closed_* when it closes, for its manifest entry
+        self.section_duplicates = 0
+        self.section_exact_only = []
+        self.closed_duplicates = 0
+        self.closed_exact_only = []
+        # Lines kept since track_fresh(), when re-cleaning against an earlier run
+        self.fresh = None
+        self.current_section = None
+        self.section_content = []
+        self.section_info = []
+
+    def feed(self, line):
+        """Process one raw line; returns the section it closed, or None."""
+        self.lines_read += 1
+        return self.feed_prepared(prepare_line(line))
+
+    def feed_prepared(self, prepared):
+        """Like feed(), for a line already run through prepare_line().
+
+        Only the stateful part (deduplication and section assembly) happens
+        here, so lines can be prepared elsewhere, e.g. in clean_pool workers.
+        """
+        if prepared is None:
+            self.lines_junk += 1
+            return None
+        line, info, normalized, parts = prepared
+
+        # Handle social media links
+        if info.kind == CONTACT:
+            for sub_line, sub_info, sub_normalized in parts:
+                if sub_normalized not in self.seen_exact:
+                    self.seen_exact.add(sub_normalized)
+                    if self.fresh is not None:
+                        self.fresh.add(sub_normalized, fuzzy=False)
+                    self.section_content.append(sub_line)
+                    self.section_info.append(sub_info)
+                    self.section_exact_only.append(sub_normalized)
+                else:
+                    self.section_duplicates += 1
+            return None
+
+        # Deduplication with fuzzy matching
+        start = time.perf_counter()
+        duplicate = normalized in self.seen_exact or self.near_duplicates.contains_similar(normalized)
+        if not duplicate:
+            self.seen_exact.add(normalized)
+            self.near_duplicates.add(normalized)
+            if self.fresh is not None:
+                self.fresh.add(normalized)
+        self.dedup_seconds += time.perf_counter() - start
+        if duplicate:
+            self.lines_duplicate += 1
+            self.section_duplicates += 1
+            return None
+
+        # Restructure Content
+        if info.kind == HEADING:
+            finished = self._close_section()
+            self.current_section = line.strip("# ").strip()
+            self.sections_opened += 1
+            return finished
+
+        self.section_content.append(line)
+        self.section_info.append(info)
+        return None
+
+    def track_fresh(self):
+        """Collect the lines kept from now on in `fresh` (a SeenLines)."""
+        self.fresh = SeenLines(self.new_index())
+
+    def new_index(self):
+        """An empty near-duplicate index of the same kind as this cleaner's."""
+        return type(self.near_duplicates)(self.near_duplicates.threshold)
+
+    def is_new(self, normalized, fuzzy=True):
+        """True if a line would not be dropped as a duplicate of what was kept so far."""
+        return not (normalized in self.seen_exact or (fuzzy and self.near_duplicates.contains_similar(normalized)))
+
+    def remember(self, lines):
+        """Count (normalized, fuzzy) lines from section_lines() as seen, so what follows is deduplicated against them."""
+        for normalized, fuzzy in lines:
+            if normalized not in self.seen_exact:
+                self.seen_exact.add(normalized)
+                if fuzzy:
+                    self.near_duplicates.add(normalized)
+
+    def finish(self):
+        """Close the last open section; returns it, or None."""
+        finished = self._close_section()
+        self.current_section = None
+        return finished
+
+    def _close_section(self):
+        finished = None
+        if self.current_section:
+            finished = format_section(self.current_section, self.section_content, self.section_info)
+        # Content before the first heading is dropped, as it always was
+        self.section_content = []
+        self.section_info = []
+        self.closed_duplicates, self.section_duplicates = self.section_duplicates, 0
+        self.closed_exact_only, self.section_exact_only = self.section_exact_only, []
+        return finished
+
+def section_lines(section, exact_only=()):
+    """(normalized, fuzzy) for each line of a formatted section, as the cleaner deduplicated it.
+
+    The lines in `exact_only` (normalized contact lines) were only matched exactly.
+    """
+    exact_only = set(exact_only)
+    for line in section.split("\n"):
+        if len(line) >= 2 and line[0] == line[-1] == '"':
+            line = line[1:-1]
+        if line:  # Spacer lines were never input
+            normalized = normalize_line(line)
+            yield normalized, normalized not in exact_only
+
+class _Lookahead:
+    """Iterator over segments that can look ahead and take segments back."""
+
+    def __init__(self, segments):
+        self._segments = iter(segments)
+        self._back = deque()
+
+    def next(self):
+        return self._back.popleft() if self._back else next(self._segments, None)
+
+    def peek(self):
+        segment = self.next()
+        if segment is not None:
+            self._back.appendleft(segment)
+        return segment
+
+    def push(self, segments):
+        self._back.extendleft(reversed(segments))
+
+def _match(previous, first, segments, expected=None):
+    """The earlier entry made of `first` and the segments after it, as (entry, segments), or None.
+
+    `expected` wins if it matches, then the longest match. Segments read
+    ahead but not part of the match are pushed back.
+    """
+    candidates = previous.starting_with(first[0])
+    run = [first]
+    best = None
+    while candidates:
+        complete = [entry for entry in candidates if len(entry["segments"]) == len(run)]
+        if any(entry is expected for entry in complete):
+            best = (expected, len(run))
+            break
+        if complete:
+            best = (complete[0], len(run))
+        candidates = [entry for entry in candidates if len(entry["segments"]) > len(run)]
+        segment = segments.next() if candidates else None
+        if segment is None:
+            break
+        run.append(segment)
+        candidates = [entry for entry in candidates if entry["segments"][len(run) - 1] == segment[0]]
+    length = best[1] if best else 1
+    segments.push(run[length:])
+    return (best[0], run[:length]) if best else None
+
+def _copy_is_exact(cleaner, lines, in_place, following):
+    """Whether copying an earlier section's (normalized, fuzzy) `lines` gives what re-cleaning would.
+
+    Out of place, none of them may duplicate a line cleaned anew since. And
+    the section has to end where it did: the next segment, if any, must
+    still open a section of its own, i.e. start with a heading that isn't a
+    duplicate of anything kept so far or in the copied section.
+    """
+    if not in_place and any(cleaner.fresh.contains(normalized, fuzzy) for normalized, fuzzy in lines):
+        return False
+    if following is None:
+        return True
+    prepared = prepare_line(following[1][0])
+    if prepared is None or prepared.info.kind != HEADING or not cleaner.is_new(prepared.normalized):
+        return False
+    copied = SeenLines(cleaner.new_index())
+    for normalized, fuzzy in lines:
+        copied.add(normalized, fuzzy)
+    return not copied.contains(prepared.normalized)
+
+def clean_segments(segments, dedup_index=None, progress=None, previous=None, preamble=None):
+    """Yield (section, manifest entry) from raw segments (manifest.iter_segments).
+
+    A section `previous` (manifest.PreviousOutput) has for the same raw
+    segments is copied from it instead of being cleaned again, but only
+    where that gives exactly what cleaning would: either everything before
+    it is unchanged, so the dedup state is too, or it dropped no duplicates
+    and clashes with nothing cleaned anew (see _copy_is_exact). Copied
+    lines still count as seen when deduplicating the rest. Otherwise the
+    segments are cleaned as usual.
+
+    Hashes of the segments before the first section are appended to
+    `preamble`, if given. `progress` (jobs.Progress) is pointed at the
+    cleaner. Raises cancellation.Cancelled as soon as the job is cancelled.
+    """
+    cleaner = StreamingCleaner(dedup_index)
+    if progress is not None:
+        progress.watch(cleaner=cleaner)
+    if previous is not None:
+        cleaner.track_fresh()
+    segments = _Lookahead(segments)
+    span = preamble if preamble is not None else []  # Hashes of the segments the open section is made of
+    position = 0  # Segments consumed so far
+    in_sync = previous is not None  # Every segment so far is the earlier run's, in order
+    copied = set()  # ids of the entries copied so far; each only once, as it was only kept once
+
+    while (segment := segments.next()) is not None:
+        check_cancelled()
+        expected = previous.entry_at.get(position) if in_sync else None
+        match = _match(previous, segment, segments, expected) if previous is not None else None
+        if match is not None:
+            entry, run = match
+            in_place = entry is expected
+            if id(entry) not in copied and (in_place or entry["duplicates"] == 0):
+                section = previous.read(entry)
+                lines = list(section_lines(section, entry["exact_only"]))
+                if _copy_is_exact(cleaner, lines, in_place, segments.peek()):
+                    finished = cleaner.finish()
+                    if finished is not None:
+                        yield finished, new_entry(finished, span, cleaner.closed_duplicates, cleaner.closed_exact_only)
+                    cleaner.remember(lines)
+                    copied.add(id(entry))
+                    cleaner.lines_read += sum(len(segment_lines) for _, segment_lines in run)
+                    yield section, new_entry(section, [segment_hash for segment_hash, _ in run],
+                                             entry["duplicates"], entry["exact_only"])
+                    span = []
+                    in_sync = in_place
+                    position += len(run)
+                    continue
+            segments.push(run[1:])
+
+        segment_hash, lines = segment
+        opened = cleaner.sections_opened
+        for line in lines:
+            check_cancelled()
+            section = cleaner.feed(line)
+            if section is not None:
+                yield section, new_entry(section, span, cleaner.closed_duplicates, cleaner.closed_exact_only)
+        # Only a segment's first line can open a section; if it didn't, the segment joins the open one
+        if cleaner.sections_opened != opened:
+            span = [segment_hash]
+        else:
+            span.append(segment_hash)
+        in_sync = in_sync and position < len(previous.sequence) and previous.sequence[position] == segment_hash
+        position += 1
+
+    section = cleaner.finish()
+    if section is not None:
+        yield section, new_entry(section, span, cleaner.closed_duplicates, cleaner.closed_exact_only)
+    metrics.record("dedup", cleaner.dedup_seconds)
+
+def format_section(section_title, section_content, classifications=None):
+    """Formats a section with proper structure and quotes.
+
+    `classifications` are the classifier results for `section_content`, if
+    the caller already has them; otherwise each item is classified here.
+    """
+    if classifications is None:
+        classifications = [CLASSIFIER.classify(item) for item in section_content]
+
+    formatted = [f'"# {section_title}"']
+    for i, (item, info) in enumerate(zip(section_content, classifications)):
+        # Skip if it's UI junk that slipped through
+        if info.kind == JUNK:
+            continue
+            
+        bullet = "- " if not item.startswith('- ') else ""
+        formatted_line = f'"{bullet}{item}"'
+        formatted.append(formatted_line)
+        
+        # Add newline after image or before contact info
+        if i < len(section_content) - 1:
+            next_item = section_content[i+1]
+            if (info.image or 
+                ('address' in item.lower() and 
+                 any(x in next_item.lower() for x in ['phone', 'mobile', 'email']))):
+                formatted.append('""')
+    
+    return '\n'.join(formatted)
+
+class SectionWriter:
+    """Writes formatted sections to a file as they are produced.
+
+    Whether a spacer line follows a section depends on the next one, so a
+    single section is held back until its successor (or close()) arrives.
+    Each written section is also counted into `stats` (analysis.TokenStats)
+    and split into RAG chunks by `chunker` (chunker.Chunker) when given.
+    """
+
+    def __init__(self, f, stats=None, chunker=None):
+        self.f = f
+        self.stats = stats
+        self.chunker = chunker
+        self.entries = 0
+        self.bytes_written = 0
+        # (start, end, tokens) of every section written, spacers left out
+        self.written = []
+        # Last sections written, for previews of a job still running
+        self.recent = deque(maxlen=PREVIEW_SECTIONS)
+        self._pending = None
+
+    def write(self, section, source=None):
+        """Queue `section`; `source` is the URL of the page it came from."""
+        if self._pending is not None:
+            self._emit(*self._pending)
+            if needs_newline_after(self._pending[0], section):
+                self._emit('""', spacer=True)  # Empty quoted line for newline
+        self._pending = (section, source)
+
+    def close(self):
+        if self._pending is not None:
+            self._emit(*self._pending)
+            self._pending = None
+
+    def _emit(self, text, source=None, spacer=False):
+        if self.entries:
+            self.f.write('\n')
+            self.bytes_written += 1
+        self.f.write(text)
+        if self.stats is not None:
+            self.stats.add(text)
+        if self.chunker is not None:
+            self.chunker.add(text, self.bytes_written, source)
+        start = self.bytes_written
+        self.bytes_written += len(text.encode('utf-8'))
+        if not spacer:
+            tokens = self.stats.sections[-1][1] if self.stats is not None else None
+            self.written.append((start, self.bytes_written, tokens))
+        self.entries += 1
+        self.recent.append(text)
+
+def clean_and_restructure_file(file_path, dedup_index=None, source_url=None, progress=None, previous=None):
+    """Cleans and restructures a text file with proper formatting.
+
+    The file is run through clean_segments() into a temporary file that
+    replaces the original once complete. `dedup_index` is a
+    dedup.NearDuplicateIndex used for fuzzy matching; defaults to the
+    q-gram index. When token stats are available, RAG chunks are written
+    next to the file too, attributed to `source_url`. `progress`
+    (jobs.Progress) follows the cleaning as it happens.
+
+    The file is read one raw segment at a time. A manifest of the sections
+    written (heading, content hash, token count, byte range, raw segments)
+    is saved next to the file. `previous` is an earlier output of the same
+    page as an (llm.txt path, manifest path) pair; sections whose raw text
+    is unchanged are copied from it where clean_segments() allows, and the
+    manifest.SectionDiff against it is returned and saved in the manifest.
+    """
+    try:
+        source = open(file_path, 'r', encoding='utf-8')
+    except FileNotFoundError:
+        print(f"Error: File '{file_path}' not found.")
+        return
+
+    earlier = PreviousOutput.load(*previous) if previous else None
+    tmp_path = f"{file_path}.tmp"
+    chunks_tmp_path = f"{chunks_path(file_path)}.tmp"
+    try:
+        with source, open(tmp_path, 'w', encoding='utf-8') as f, \
+                open(chunks_tmp_path, 'w', encoding='utf-8') as chunks_file:
+            stats = new_stats()
+            chunker = Chunker(chunks_file, source_url, encoding_name=stats.encodings[0]) if stats else None
+            writer = SectionWriter(f, stats, chunker)
+            if progress is not None:
+                progress.watch(writer=writer)
+            lines = (line[:-1] if line.endswith('\n') else line for line in source)
+            preamble = []
+            entries = []
+            for section, entry in clean_segments(iter_segments(lines), dedup_index, progress, earlier, preamble):
+                writer.write(section)
+                entries.append(entry)
+            writer.close()
+        os.replace(tmp_path, file_path)
+        for entry, (start, end, tokens) in zip(entries, writer.written):
+            entry.update(start=start, end=end, tokens=tokens)
+        diff = diff_sections(earlier.entries, entries) if earlier is not None else None
+        save_manifest(manifest_path(file_path), entries, preamble, diff)
+        if stats is not None:
+            stats.save(stats_path(file_path))
+            os.replace(chunks_tmp_path, chunks_path(file_path))
+    except IOError:
+        print(f"Error: Unable to write to file '{file_path}'.")
+        return
+    finally:
+        if earlier is not None:
+            earlier.close()
+        for path in (tmp_path, chunks_tmp_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    print(f"[✔] Cleaned and restructured file: {file_path} | Lines kept: {writer.entries}")
+    if diff is not None:
+        print(f"[✔] Sections: {len(diff.added)} added, {len(diff.removed)} removed, "
+              f"{len(diff.changed)} changed, {diff.unchanged} unchanged")
+        return diff
@@ -0,0 +1,143 @@
+import asyncio
+import os
+import re
+import time
+from collections import deque
+from urllib.parse import parse_qsl, urldefrag, urlencode, urljoin, urlsplit, urlunsplit
+
+from classifier import FILE_EXTENSIONS
+
+SITE_MAX_PAGES = int(os.getenv("WEB2LLM_SITE_MAX_PAGES", "50"))
+SITE_MAX_DEPTH = int(os.getenv("WEB2LLM_SITE_MAX_DEPTH", "3"))
+SITE_CONCURRENCY = int(os.getenv("WEB2LLM_SITE_CONCURRENCY", "4"))
+# Minimum seconds between two requests to the same host
+SITE_HOST_DELAY = float(os.getenv("WEB2LLM_SITE_HOST_DELAY", "1.0"))
+
+# Server-side page extensions are still pages, everything else in the list is an asset
+_PAGE_EXTENSIONS = {'php', 'asp', 'aspx', 'jsp', 'cgi', 'pl'}
+_ASSET_EXTENSIONS = tuple(f".{ext}" for ext in FILE_EXTENSIONS if ext not in _PAGE_EXTENSIONS)
+
+_TRACKING_PARAMS = re.compile(r'^(utm_\w+|gclid|fbclid|mc_cid|mc_eid|ref)$', re.IGNORECASE)
+_MARKDOWN_LINK = re.compile(r'\]\(\s*<?([^)\s>]+)>?(?:\s+"[^"]*")?\s*\)')
+_BARE_URL = re.compile(r'(?<![(<])\bhttps?://[^\s)\]>"\']+')
+
+
+def canonicalize_url(url):
+    """Normalize a URL so the same page is only crawled once.
+
+    Lowercases scheme and host, drops default ports, fragments and tracking
+    parameters, sorts the query and gives empty paths a "/".
+    """
+    url, _ = urldefrag(url.strip())
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    port = parts.port
+    if port and not ((scheme == "http" and port == 80) or (scheme == "https" and port == 443)):
+        host = f"{host}:{port}"
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not _TRACKING_PARAMS.match(k)
+    ))
+    return urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+
+def site_key(url):
+    """Host used for scoping; "www." and the scheme don't make a different site."""
+    host = urlsplit(url).netloc.lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def extract_links(markdown, base_url):
+    """Canonical same-site page links found in a page's markdown."""
+    links = []
+    seen = set()
+    site = site_key(base_url)
+    for href in _MARKDOWN_LINK.findall(markdown) + _BARE_URL.findall(markdown):
+        url = urljoin(base_url, href)
+        if urlsplit(url).scheme not in ("http", "https"):
+            continue
+        url = canonicalize_url(url)
+        if site_key(url) != site or url in seen:
+            continue
+        if urlsplit(url).path.lower().endswith(_ASSET_EXTENSIONS):
+            continue
+        seen.add(url)
+        links.append(url)
+    return links
+
+
+class SiteCrawler:
+    """Breadth-first crawl of one site with bounded concurrency.
+
+    `fetch(url)` returns a page's markdown. Pages are yielded by crawl() as
+    soon as they finish, so the caller can clean and write them while the
+    rest of the site is still being fetched.
+    """
+
+    def __init__(self, start_url, fetch, max_pages=SITE_MAX_PAGES, max_depth=SITE_MAX_DEPTH,
+                 concurrency=SITE_CONCURRENCY, host_delay=SITE_HOST_DELAY):
+        self.start_url = canonicalize_url(start_url)
+        self.fetch = fetch
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.concurrency = concurrency
+        self.host_delay = host_delay
+        self.pages_fetched = 0
+        self.pages_failed = 0
+        self._frontier = deque()
+        self._seen = set()
+        self._host_locks = {}
+        self._host_next_slot = {}
+
+    def _add(self, url, depth):
+        if url not in self._seen:
+            self._seen.add(url)
+            self._frontier.append((url, depth))
+
+    async def _polite(self, url):
+        """Wait until the host's politeness delay has passed."""
+        host = urlsplit(url).netloc
+        lock = self._host_locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            wait = self._host_next_slot.get(host, 0) - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._host_next_slot[host] = time.monotonic() + self.host_delay
+
+    async def _fetch(self, url, depth):
+        await self._polite(url)
+        try:
+            return url, depth, await self.fetch(url)
+        except Exception as e:
+            print(f"Error: failed to crawl {url}: {e}")
+            return url, depth, None
+
+    async def crawl(self):
+        """Yield (url, markdown) for each crawled page, in completion order."""
+        self._add(self.start_url, 0)
+        scheduled = 0
+        in_flight = set()
+        try:
+            while self._frontier or in_flight:
+                while self._frontier and len(in_flight) < self.concurrency and scheduled < self.max_pages:
+                    url, depth = self._frontier.popleft()
+                    in_flight.add(asyncio.create_task(self._fetch(url, depth)))
+                    scheduled += 1
+                if not in_flight:
+                    break
+
+                done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    url, depth, markdown = task.result()
+                    if markdown is None:
+                        self.pages_failed += 1
+                        continue
+                    self.pages_fetched += 1
+                    if depth < self.max_depth:
+                        for link in extract_links(markdown, url):
+                            self._add(link, depth + 1)
+                    yield url, markdown
+        finally:
+            for task in in_flight:
+                task.cancel()
@@ -0,0 +1,178 @@
+import asyncio
+import contextlib
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from workspace import OUTPUT_DIR
+
+DB_PATH = os.getenv("WEB2LLM_DB_PATH", os.path.join(OUTPUT_DIR, "history.db"))
+# Submissions buffered in memory at most; the oldest are dropped beyond this
+BUFFER_SIZE = int(os.getenv("WEB2LLM_HISTORY_BUFFER", "10000"))
+# Rows written per transaction, and the longest a submission waits to be written
+BATCH_SIZE = 500
+FLUSH_INTERVAL = 1.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS url_history (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    url TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS url_history_created ON url_history (created_at);
+CREATE INDEX IF NOT EXISTS url_history_user ON url_history (user_id, created_at);
+CREATE INDEX IF NOT EXISTS url_history_url ON url_history (url);
+"""
+
+
+def connect(path=DB_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, timeout=10)
+    # WAL lets the queries below read while the writer thread commits
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class UrlHistory:
+    """Write-behind log of submitted URLs in SQLite.
+
+    log() only appends to a bounded in-memory buffer, so it never blocks
+    the event loop. A background thread writes the buffer out in batches,
+    one transaction per batch, at most FLUSH_INTERVAL seconds after a
+    submission arrives, over one connection kept for the thread's lifetime.
+    """
+
+    def __init__(self, path=DB_PATH, buffer_size=BUFFER_SIZE):
+        self.path = path
+        self.dropped = 0
+        self._buffer = deque(maxlen=buffer_size)
+        self._wake = threading.Condition()
+        self._thread = None
+        self._stopping = False
+
+    def create_table(self):
+        with contextlib.closing(connect(self.path)) as conn:
+            conn.executescript(SCHEMA)
+
+    def log(self, user_id, url):
+        """Queue one submission for writing."""
+        with self._wake:
+            if len(self._buffer) == self._buffer.maxlen:
+                self.dropped += 1
+            self._buffer.append((user_id or "", url, time.time()))
+            # Wake the writer when it has something to wait on, and when a batch is full
+            if len(self._buffer) in (1, BATCH_SIZE):
+                self._wake.notify()
+        self._start()
+
+    def _write(self, conn):
+        """Write everything buffered so far; returns the number of rows written."""
+        written = 0
+        while True:
+            with self._wake:
+                batch = [self._buffer.popleft() for _ in range(min(BATCH_SIZE, len(self._buffer)))]
+            if not batch:
+                return written
+            with conn:
+                conn.executemany("INSERT INTO url_history (user_id, url, created_at) VALUES (?, ?, ?)", batch)
+            written += len(batch)
+
+    def close(self):
+        """Stop the writer thread after a last flush."""
+        with self._wake:
+            self._stopping = True
+            self._wake.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._stopping = False
+
+    @contextlib.asynccontextmanager
+    async def lifespan(self):
+        """App lifespan hook: create the table on startup, write out what's still buffered on shutdown."""
+        await asyncio.to_thread(self.create_table)
+        try:
+            yield
+        finally:
+            self.close()
+
+    def _start(self):
+        # Started lazily so importing the app doesn't spawn threads
+        if self._thread is None:
+            with self._wake:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="url-history", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        conn = None  # Opened on the first write, then reused
+        try:
+            while True:
+                with self._wake:
+                    # Idle until something is logged, then give it time to fill a batch
+                    while not self._buffer and not self._stopping:
+                        self._wake.wait()
+                    if not self._stopping and len(self._buffer) < BATCH_SIZE:
+                        self._wake.wait(FLUSH_INTERVAL)
+                    stopping, pending = self._stopping, bool(self._buffer)
+                if pending:
+                    try:
+                        if conn is None:
+                            conn = connect(self.path)
+                        self._write(conn)
+                    except sqlite3.Error as e:
+                        print(f"Error: could not save URL history: {e}")
+                        if conn is not None:
+                            conn.close()
+                        conn = None
+                if stopping:
+                    return
+        finally:
+            if conn is not None:
+                conn.close()
+
+    # Queries, all served by the indexes above. They see rows once flushed, and
+    # run in a worker thread so callers on the event loop never wait on SQLite.
+
+    def _query(self, sql, params):
+        with contextlib.closing(connect(self.path)) as conn:
+            return conn.execute(sql, params).fetchall()
+
+    async def recent(self, limit=50):
+        """Most recently submitted URLs, newest first, without repeats."""
+        rows = await asyncio.to_thread(
+            self._query,
+            "SELECT url, MAX(created_at) AS last FROM url_history GROUP BY url ORDER BY last DESC LIMIT ?",
+            (limit,),
+        )
+        return [url for url, _ in rows]
+
+    async def user_history(self, user_id, limit=50):
+        """(url, submitted_at) pairs for one user, newest first."""
+        return await asyncio.to_thread(
+            self._query,
+            "SELECT url, created_at FROM url_history WHERE user_id = ? ORDER BY created_at DESC LIMIT ?",
+            (user_id, limit),
+        )
+
+    async def most_requested(self, limit=20, since=None):
+        """(url, count) pairs, most submitted first; only since the `since` timestamp, if given."""
+        return await asyncio.to_thread(
+            self._query,
+            "SELECT url, COUNT(*) AS requests FROM url_history WHERE created_at >= ? "
+            "GROUP BY url ORDER BY requests DESC LIMIT ?",
+            (since or 0, limit),
+        )
+
+
+# Shared by every session in the process
+url_history = UrlHistory()
+
+
+def save_user_url(user_id, url):
+    """Record a submission without blocking; it is written shortly after."""
+    url_history.log(user_id, url)
@@ -0,0 +1,160 @@
+import math
+from collections import Counter, defaultdict
+
+import textdistance
+
+# Lines whose Jaro-Winkler similarity is above this are treated as duplicates
+SIMILARITY_THRESHOLD = 0.92
+
+# Winkler's prefix bonus is at most 4 chars * 0.1 weight
+_MAX_PREFIX_BONUS = 0.4
+
+
+def jaro_floor(threshold=SIMILARITY_THRESHOLD):
+    """Smallest plain Jaro score that can still push Jaro-Winkler past `threshold`."""
+    return (threshold - _MAX_PREFIX_BONUS) / (1 - _MAX_PREFIX_BONUS)
+
+
+def min_length_ratio(threshold=SIMILARITY_THRESHOLD):
+    """Shortest/longest length ratio below which two strings can never match.
+
+    Jaro is at most (1 + short/long + 1) / 3, so anything under this ratio
+    fails the threshold without running the comparison.
+    """
+    return max(0.0, 3 * jaro_floor(threshold) - 2)
+
+
+def is_near_duplicate(a, b, threshold=SIMILARITY_THRESHOLD):
+    """Exact check used by the original cleaner loop."""
+    return textdistance.jaro_winkler.normalized_similarity(a, b) > threshold
+
+
+class NearDuplicateIndex:
+    """Remembers normalized lines and answers "have we seen something like this?".
+
+    Subclasses only decide which stored lines are worth comparing; every
+    candidate is still verified with the exact Jaro-Winkler check.
+    """
+
+    def __init__(self, threshold=SIMILARITY_THRESHOLD):
+        self.threshold = threshold
+        self.comparisons = 0
+        self._jaro_floor = jaro_floor(threshold)
+        self._min_ratio = min_length_ratio(threshold)
+        self._entries = []
+        self._char_counts = []
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, line):
+        """Store a normalized line and return its id."""
+        entry_id = len(self._entries)
+        self._entries.append(line)
+        self._char_counts.append(Counter(line))
+        self._index(entry_id, line)
+        return entry_id
+
+    def contains_similar(self, line):
+        """True if a stored line is above the similarity threshold."""
+        counts = Counter(line)
+        for entry_id in self._candidates(line):
+            if not self._may_match(line, counts, entry_id):
+                continue
+            self.comparisons += 1
+            if is_near_duplicate(self._entries[entry_id], line, self.threshold):
+                return True
+        return False
+
+    def _may_match(self, line, counts, entry_id):
+        """Cheap upper bounds on Jaro; never rejects a real match."""
+        other = self._entries[entry_id]
+        short, long_ = sorted((len(line), len(other)))
+        if not short:
+            return False
+        if short / long_ <= self._min_ratio:
+            return False
+        common = sum((counts & self._char_counts[entry_id]).values())
+        return (common / len(line) + common / len(other) + 1) / 3 > self._jaro_floor
+
+    def _index(self, entry_id, line):
+        pass
+
+    def _candidates(self, line):
+        raise NotImplementedError
+
+
+class BruteForceIndex(NearDuplicateIndex):
+    """Compares against every stored line; the reference behaviour."""
+
+    def _candidates(self, line):
+        return range(len(self._entries))
+
+
+class QGramIndex(NearDuplicateIndex):
+    """Inverted index of padded character q-grams bucketed by line length.
+
+    Only lines that fall in the feasible length window and share at least
+    `min_overlap` of the smaller q-gram set reach the Jaro-Winkler check.
+
+    The length window is exact, but the q-gram overlap is a heuristic: Jaro
+    tolerates transposed neighbours, which break q-grams, so no positive
+    overlap can be guaranteed for a real match. A line with an adjacent pair
+    swapped every few characters (JW ~0.93, under a third of its bigrams
+    shared) is kept although BruteForceIndex would drop it. Real near
+    duplicates (typos, changed words) share far more; tests/test_dedup.py
+    checks both indexes keep the same lines on the sample pages. Use
+    make_index("brute") where the original behaviour must hold exactly.
+    """
+
+    def __init__(self, threshold=SIMILARITY_THRESHOLD, q=2, min_overlap=0.3):
+        super().__init__(threshold)
+        self.q = q
+        self.min_overlap = min_overlap
+        self._postings = defaultdict(list)
+        self._gram_sizes = []
+        self._lengths = []
+
+    def _grams(self, line):
+        padded = f"{'^' * (self.q - 1)}{line}{'$' * (self.q - 1)}"
+        return {padded[i:i + self.q] for i in range(len(padded) - self.q + 1)}
+
+    def _index(self, entry_id, line):
+        grams = self._grams(line)
+        self._gram_sizes.append(len(grams))
+        self._lengths.append(len(line))
+        for gram in grams:
+            self._postings[gram].append(entry_id)
+
+    def _candidates(self, line):
+        grams = self._grams(line)
+        length = len(line)
+        lo = length * self._min_ratio
+        hi = length / self._min_ratio if self._min_ratio else math.inf
+
+        shared = Counter()
+        for gram in grams:
+            postings = self._postings.get(gram)
+            if postings:
+                shared.update(postings)
+
+        lengths = self._lengths
+        sizes = self._gram_sizes
+        candidates = []
+        for entry_id, count in shared.items():
+            if not lo < lengths[entry_id] < hi:
+                continue
+            if count >= self.min_overlap * min(len(grams), sizes[entry_id]):
+                candidates.append((count, entry_id))
+        # Most similar first so exact matches short-circuit early
+        candidates.sort(reverse=True)
+        return [entry_id for _, entry_id in candidates]
+
+
+def make_index(kind="qgram", threshold=SIMILARITY_THRESHOLD):
+    """Build a near-duplicate index by name ("qgram" or "brute")."""
+    if kind == "brute":
+        return BruteForceIndex(threshold)
+    if kind == "qgram":
+        return QGramIndex(threshold)
+    raise ValueError(f"Unknown dedup index: {kind}")
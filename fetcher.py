@@ -0,0 +1,143 @@
+import asyncio
+import re
+from urllib.parse import urljoin
+
+import httpx
+from bs4 import BeautifulSoup, Comment, NavigableString
+
+from http_client import get_client
+
+# A page with less visible text than this is assumed to need JavaScript
+MIN_STATIC_TEXT_CHARS = 500
+# Pages carrying an SPA root must have this much server-rendered text to skip the browser
+MIN_SPA_TEXT_CHARS = 2000
+
+_SPA_MARKERS = re.compile(
+    r'<div[^>]+id=["\'](?:root|app|__next|__nuxt|svelte)["\'][^>]*>\s*</div>'
+    r'|ng-app|data-reactroot|window\.__NUXT__|window\.__INITIAL_STATE__'
+    r'|enable javascript|javascript is required',
+    re.IGNORECASE,
+)
+
+_SKIP_TAGS = ['script', 'style', 'noscript', 'svg', 'iframe', 'template', 'head', 'canvas',
+              'form', 'button', 'select', 'input', 'textarea']
+_BLOCK_TAGS = {'p', 'div', 'section', 'article', 'main', 'header', 'footer', 'nav', 'aside',
+               'ul', 'ol', 'dl', 'dt', 'dd', 'table', 'tr', 'blockquote', 'figure',
+               'figcaption', 'address', 'pre', 'hr', 'body'}
+_HEADINGS = {f'h{i}': '#' * i for i in range(1, 7)}
+
+
+class _MarkdownRenderer:
+    """Walks parsed HTML and emits markdown lines close to what Crawl4AI produces."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.lines = []
+        self._inline = []
+        self._prefix = ""
+
+    def flush(self):
+        text = " ".join("".join(self._inline).split())
+        if text:
+            self.lines.append(self._prefix + text)
+        self._inline = []
+        self._prefix = ""
+
+    def render(self, node):
+        for child in node.children:
+            if isinstance(child, Comment):
+                continue
+            if isinstance(child, NavigableString):
+                self._inline.append(str(child))
+                continue
+
+            name = child.name
+            if name in _HEADINGS or name == 'li':
+                self.flush()
+                self._prefix = f"{_HEADINGS[name]} " if name in _HEADINGS else "- "
+                self.render(child)
+                self.flush()
+            elif name == 'a':
+                self._link(child)
+            elif name == 'img':
+                self._image(child)
+            elif name == 'br':
+                self.flush()
+            elif name in ('td', 'th'):
+                self._inline.append(" | ")
+                self.render(child)
+            elif name in _BLOCK_TAGS:
+                self.flush()
+                self.render(child)
+                self.flush()
+            else:
+                self.render(child)
+
+    def _link(self, tag):
+        href = tag.get('href')
+        text = " ".join(tag.get_text(" ").split())
+        if not text:
+            self.render(tag)
+        elif href and not href.startswith(('#', 'javascript:')):
+            self._inline.append(f" [{text}]({urljoin(self.base_url, href)}) ")
+        else:
+            self._inline.append(f" {text} ")
+
+    def _image(self, tag):
+        src = tag.get('src')
+        if src:
+            alt = " ".join((tag.get('alt') or "").split())
+            self._inline.append(f" ![{alt}]({urljoin(self.base_url, src)}) ")
+
+
+def _parse(html):
+    soup = BeautifulSoup(html, "lxml")
+    for tag in soup(_SKIP_TAGS):
+        tag.decompose()
+    return soup
+
+
+def html_to_markdown(html, base_url="", soup=None):
+    """Convert server-rendered HTML to markdown without a browser."""
+    if soup is None:
+        soup = _parse(html)
+    renderer = _MarkdownRenderer(base_url)
+    renderer.render(soup.body or soup)
+    renderer.flush()
+    return "\n".join(renderer.lines)
+
+
+def looks_static(html, soup=None):
+    """Heuristic: is the content already in the HTML, or rendered by JavaScript?"""
+    if soup is None:
+        soup = _parse(html)
+    text_chars = len(" ".join((soup.body or soup).get_text(" ").split()))
+    if _SPA_MARKERS.search(html):
+        return text_chars >= MIN_SPA_TEXT_CHARS
+    return text_chars >= MIN_STATIC_TEXT_CHARS
+
+
+async def fetch_static(url, response=None):
+    """Markdown for `url` if plain HTTP is enough, else None (use the browser).
+
+    Pass `response` when the page has already been fetched (e.g. by the
+    page cache's revalidation) to skip the request.
+    """
+    if response is None:
+        try:
+            response = await get_client().get(url)
+        except httpx.HTTPError:
+            return None
+
+    content_type = response.headers.get("content-type", "")
+    if response.status_code != 200 or "html" not in content_type:
+        return None
+    # Parsing a large page is CPU work; keep it off the event loop
+    return await asyncio.to_thread(_static_markdown, response.text, str(response.url))
+
+
+def _static_markdown(html, base_url):
+    soup = _parse(html)
+    if not looks_static(html, soup):
+        return None
+    return html_to_markdown(html, base_url, soup)
@@ -0,0 +1,116 @@
+import contextlib
+import importlib.util
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+import httpx
+
+REQUEST_TIMEOUT = 10.0
+USER_AGENT = "Mozilla/5.0 (compatible; Web2LLM/1.0; +https://github.com/buildwithfiroz/Web2-LLM.txt)"
+
+# HTTP/2 needs the optional h2 package
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+_client = None
+
+
+def get_client():
+    """App-lifetime client shared by every request in the process.
+
+    Keeps connections alive between requests so each host pays for one TLS
+    handshake, and multiplexes over HTTP/2 where the server supports it.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=REQUEST_TIMEOUT,
+            follow_redirects=True,
+            headers={"User-Agent": USER_AGENT},
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        )
+    return _client
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+@contextlib.asynccontextmanager
+async def lifespan():
+    """App lifespan hook: close pooled connections on shutdown."""
+    try:
+        yield
+    finally:
+        await close_client()
+
+
+class TTLCache:
+    """Size-bounded LRU mapping whose entries each expire after their own TTL."""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if time.monotonic() >= expires_at:
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value, ttl):
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+
+class HostFailures:
+    """Tracks consecutive failures per host and backs off from hosts that keep failing."""
+
+    def __init__(self, threshold=3, cooldown=60.0, maxsize=1024):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = TTLCache(maxsize)
+
+    @staticmethod
+    def _host(url):
+        return urlsplit(url).netloc.lower()
+
+    def is_blocked(self, url):
+        return self._failures.get(self._host(url), 0) >= self.threshold
+
+    def record(self, url, ok):
+        host = self._host(url)
+        if ok:
+            self._failures.pop(host)
+        else:
+            self._failures.set(host, self._failures.get(host, 0) + 1, self.cooldown)
+
+
+async def probe(url, timeout=3.0):
+    """Status code of `url` from a GET that stops after the response headers.
+
+    A one-byte Range is requested; servers that ignore it still send a full
+    200, but the body is never read.
+    """
+    async with get_client().stream("GET", url, headers={"Range": "bytes=0-0"}, timeout=timeout) as response:
+        if response.status_code == 416:  # Range not satisfiable, e.g. empty body
+            return 200
+        return 200 if response.status_code == 206 else response.status_code
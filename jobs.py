@@ -0,0 +1,258 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+
+from cancellation import CancelToken, Cancelled, await_with_timeout, current_token
+from metrics import metrics
+from workspace import new_job_id, prune_job_dirs
+
+# Job statuses, in the order a job moves through them
+QUEUED = "queued"
+CRAWLING = "crawling"
+CLEANING = "cleaning"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED = (DONE, FAILED, CANCELLED)
+
+DEFAULT_WORKERS = int(os.getenv("WEB2LLM_WORKERS", "2"))
+DEFAULT_MAX_QUEUED = int(os.getenv("WEB2LLM_MAX_QUEUED", "20"))
+# Wall-clock budget of one generation, in seconds, from when a worker picks it up
+JOB_TIMEOUT = float(os.getenv("WEB2LLM_JOB_TIMEOUT", "900"))
+# Finished jobs kept around so the UI can still read their status and output
+FINISHED_JOBS_KEPT = 500
+# Output of finished jobs is deleted after this many hours, or sooner once FINISHED_JOBS_KEPT is exceeded
+JOB_RETENTION_HOURS = float(os.getenv("WEB2LLM_JOB_RETENTION_HOURS", "24"))
+# Most frequent progress updates sent for one job, in seconds
+PROGRESS_INTERVAL = float(os.getenv("WEB2LLM_PROGRESS_INTERVAL", "0.5"))
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+class Progress:
+    """Live counters of a running generation.
+
+    The pipeline points it at the objects doing the work (watch()) and the
+    counters are read from those on demand, so the crawl and clean loops
+    never stop to report. The cleaning threads only ever add to them, so
+    a snapshot taken mid-run is at worst a moment out of date.
+    """
+
+    def __init__(self):
+        self.pages_fetched = 0  # Set directly by single-page generations
+        self.crawler = None  # crawler.SiteCrawler
+        self.cleaner = None  # cleaner.StreamingCleaner
+        self.writer = None  # cleaner.SectionWriter
+        self.boilerplate = None  # boilerplate.BoilerplateModel
+        self._final = None
+
+    def watch(self, **sources):
+        for name, source in sources.items():
+            setattr(self, name, source)
+
+    def finish(self):
+        """Freeze the counters and let go of the pipeline objects.
+
+        Finished jobs are kept around for a while, and the cleaner's dedup
+        index alone can hold tens of MB.
+        """
+        self._final = self.snapshot()
+        self.crawler = self.cleaner = self.writer = self.boilerplate = None
+
+    def snapshot(self):
+        """Counters so far, and the latest cleaned sections as a preview."""
+        if self._final is not None:
+            return self._final
+        cleaner, writer = self.cleaner, self.writer
+        stats = writer.stats if writer is not None else None
+        return {
+            "pages_fetched": self.crawler.pages_fetched if self.crawler is not None else self.pages_fetched,
+            "lines_read": cleaner.lines_read if cleaner is not None else 0,
+            "lines_junk": (cleaner.lines_junk if cleaner is not None else 0)
+                          + (self.boilerplate.lines_removed if self.boilerplate is not None else 0),
+            "lines_duplicate": cleaner.lines_duplicate if cleaner is not None else 0,
+            "sections": writer.entries if writer is not None else 0,
+            "tokens": stats.tokens(stats.encodings[0]) if stats is not None else 0,
+            "preview": "\n".join(list(writer.recent)) if writer is not None else "",
+        }
+
+
+class Job:
+    """One generation request and where it is in the pipeline."""
+
+    def __init__(self, job_id, url, options=None):
+        self.job_id = job_id
+        self.url = url
+        # Extra keyword arguments for the runner, e.g. whole_site=True
+        self.options = options or {}
+        self.status = QUEUED
+        self.error = ""
+        self.progress = Progress()
+        self.cancel_token = CancelToken()
+        self.task = None  # Set while the runner is running
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.status in FINISHED
+
+
+class JobQueue:
+    """FIFO queue of generations served by a fixed pool of async workers.
+
+    At most `workers` crawls run at once; at most `max_queued` more may
+    wait. Anything beyond that is rejected with QueueFullError instead of
+    piling up behind the headless browser.
+    """
+
+    def __init__(self, runner, workers=DEFAULT_WORKERS, max_queued=DEFAULT_MAX_QUEUED, timeout=JOB_TIMEOUT):
+        # runner(url, job_id, on_status, progress=..., **options) does the actual crawl + clean
+        self.runner = runner
+        self.workers = workers
+        self.max_queued = max_queued
+        self.timeout = timeout
+        self._jobs = OrderedDict()
+        self._queue = None
+        self._tasks = []
+
+    def submit(self, url, job_id=None, **options):
+        """Queue a generation and return its Job; raises QueueFullError."""
+        self._start()
+        job = Job(job_id or new_job_id(), url, options)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise QueueFullError(
+                f"{self.max_queued} generations are already waiting. Please try again shortly."
+            ) from None
+        self._jobs[job.job_id] = job
+        self._prune()
+        return job
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id, reason="Cancelled"):
+        """Stop a queued or running job; returns False if there was nothing to stop.
+
+        The runner's task is cancelled and the job's CancelToken set, so work
+        it left running in threads stops at its next check too.
+        """
+        job = self._jobs.get(job_id)
+        if job is None or job.finished:
+            return False
+        job.cancel_token.cancel(reason)
+        if job.task is not None:
+            job.task.cancel()
+        else:
+            job.status = CANCELLED
+            job.error = reason
+            job.finished_at = time.time()
+        return True
+
+    async def updates(self, job_id, interval=PROGRESS_INTERVAL):
+        """Yield (job, status, position, progress snapshot) whenever one changes.
+
+        Checked every `interval` seconds, so at most one update per interval
+        however fast the pipeline goes. Ends after the job finishes.
+        """
+        last = None
+        while True:
+            job = self.get(job_id)
+            if job is None:
+                return
+            update = (job.status, self.position(job_id), job.progress.snapshot())
+            if update != last:
+                last = update
+                yield (job,) + update
+            if job.finished:
+                return
+            await asyncio.sleep(interval)
+
+    def position(self, job_id):
+        """1-based place in line for a queued job, 0 once it has started."""
+        place = 0
+        for job in self._jobs.values():
+            if job.status == QUEUED:
+                place += 1
+                if job.job_id == job_id:
+                    return place
+        return 0
+
+    def _start(self):
+        # Created lazily so the queue and workers bind to the server's event loop
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._tasks = [task for task in self._tasks if not task.done()]
+        while len(self._tasks) < self.workers:
+            self._tasks.append(asyncio.create_task(self._worker()))
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+            await self._sweep()
+
+    async def _run(self, job):
+        if job.finished:  # Cancelled while it was waiting
+            return
+        job.started_at = time.time()
+
+        def on_status(status):
+            job.status = status
+
+        on_status(CRAWLING)
+        job.task = asyncio.create_task(self._execute(job, on_status))
+        try:
+            with metrics.span("total", job.job_id):
+                await await_with_timeout(job.task, job.cancel_token, self.timeout)
+        except (asyncio.CancelledError, Cancelled):
+            if not job.cancel_token.cancelled:
+                # The worker itself is being cancelled (server shutdown)
+                job.cancel_token.cancel("Server shutting down")
+                job.task.cancel()
+                self._stopped(job)
+                raise
+            self._stopped(job)
+        except Exception as e:
+            job.status = FAILED
+            job.error = str(e)
+            print(f"Error: job {job.job_id} failed: {e}")
+        else:
+            job.status = DONE
+        finally:
+            job.task = None
+            job.progress.finish()
+            job.finished_at = time.time()
+
+    async def _execute(self, job, on_status):
+        # Runs in its own task, so the token is seen by everything the runner starts and nothing else
+        current_token.set(job.cancel_token)
+        await self.runner(job.url, job.job_id, on_status, progress=job.progress, **job.options)
+
+    def _stopped(self, job):
+        job.status = CANCELLED
+        job.error = job.cancel_token.reason
+        print(f"Error: job {job.job_id} stopped: {job.error}")
+
+    async def _sweep(self):
+        # The directories of jobs still queued or running are never touched
+        active = {job_id for job_id, job in self._jobs.items() if not job.finished}
+        try:
+            await asyncio.to_thread(prune_job_dirs, FINISHED_JOBS_KEPT, JOB_RETENTION_HOURS * 3600, active)
+        except OSError as e:
+            print(f"Error: could not delete old job output: {e}")
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - FINISHED_JOBS_KEPT)]:
+            del self._jobs[job_id]
@@ -0,0 +1,73 @@
+import os
+import re
+from array import array
+
+LINES_SUFFIX = ".lines"
+# Lines the results viewer shows at a time
+PAGE_LINES = int(os.getenv("WEB2LLM_PAGE_LINES", "200"))
+READ_CHUNK = 1 << 20
+# The index starts with the mtime (ns) and size of the file it was built from
+_HEADER = 2
+_ITEM = array("Q").itemsize
+
+
+def line_index_path(file_path):
+    """Sidecar file holding the byte offset of every line of `file_path`."""
+    return f"{file_path}{LINES_SUFFIX}"
+
+
+def build_line_index(file_path):
+    """Write the line index of `file_path`; returns its number of lines."""
+    info = os.stat(file_path)
+    offsets = array("Q", [info.st_mtime_ns, info.st_size, 0])
+    with open(file_path, "rb") as f:
+        position = 0
+        while chunk := f.read(READ_CHUNK):
+            offsets.extend(position + m.end() for m in re.finditer(b"\n", chunk))
+            position += len(chunk)
+    if offsets[-1] != position:
+        offsets.append(position)  # Last line has no trailing newline
+
+    index_path = line_index_path(file_path)
+    with open(index_path + ".tmp", "wb") as f:
+        offsets.tofile(f)
+    os.replace(index_path + ".tmp", index_path)
+    return len(offsets) - _HEADER - 1
+
+
+def _header_matches(f, file_path):
+    header = array("Q")
+    try:
+        header.fromfile(f, _HEADER)
+    except EOFError:
+        return False
+    info = os.stat(file_path)
+    return list(header) == [info.st_mtime_ns, info.st_size]
+
+
+def line_count(file_path):
+    """Number of lines in `file_path`, (re)building its index if it is missing or stale."""
+    try:
+        with open(line_index_path(file_path), "rb") as f:
+            if _header_matches(f, file_path):
+                return os.fstat(f.fileno()).st_size // _ITEM - _HEADER - 1
+    except FileNotFoundError:
+        pass
+    return build_line_index(file_path)
+
+
+def read_lines(file_path, start, count=PAGE_LINES):
+    """Lines start .. start + count - 1 (0-based) of `file_path`, without reading the rest."""
+    total = line_count(file_path)
+    start = max(0, min(start, total))
+    count = max(0, min(count, total - start))
+    if not count:
+        return []
+    offsets = array("Q")
+    with open(line_index_path(file_path), "rb") as f:
+        f.seek((_HEADER + start) * _ITEM)
+        offsets.fromfile(f, count + 1)
+    with open(file_path, "rb") as f:
+        f.seek(offsets[0])
+        data = f.read(offsets[-1] - offsets[0])
+    return data.decode("utf-8", errors="replace").split("\n")[:count]
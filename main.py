@@ -0,0 +1,173 @@
+"""Generate llm.txt files from the command line, without the Reflex UI.
+
+    python main.py urls.txt --out-dir out/ --parallel 8
+    cat urls.txt | python main.py - --bundle all.txt
+
+One URL per line (blank lines and # comments are ignored). Each URL's
+llm.txt goes to the output directory and a JSONL record with its timing and
+token stats is printed and appended to <out-dir>/results.jsonl. With
+--resume, URLs already recorded there as done are skipped.
+"""
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import time
+from urllib.parse import urlsplit
+
+import http_client
+from analysis import TokenStats, stats_path
+from browser_pool import browser_pool
+from cancellation import CancelToken, Cancelled, await_with_timeout, current_token
+from clean_pool import cleaning_pool
+from jobs import JOB_TIMEOUT
+from state import main as generate_llm_txt
+from workspace import job_dir, job_output_path
+
+RESULTS_FILENAME = "results.jsonl"
+
+
+def read_urls(source):
+    """URLs from a file object, in order, without duplicates."""
+    urls = []
+    for line in source:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            urls.append(line)
+    return list(dict.fromkeys(urls))
+
+
+def output_name(url):
+    """Stable, filesystem-safe file name for a URL's llm.txt."""
+    parts = urlsplit(url)
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", f"{parts.netloc}{parts.path}").strip("-")[:80]
+    digest = hashlib.sha1(url.encode("utf-8")).hexdigest()[:8]
+    return f"{slug or 'page'}-{digest}.txt"
+
+
+def load_completed(results_path, out_dir):
+    """URLs recorded as done whose output is still on disk."""
+    completed = set()
+    try:
+        with open(results_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Truncated last line from an interrupted run
+                if record.get("status") == "done" and os.path.exists(os.path.join(out_dir, record["output"])):
+                    completed.add(record["url"])
+    except FileNotFoundError:
+        pass
+    return completed
+
+
+async def generate(url, out_dir, whole_site, timeout=JOB_TIMEOUT):
+    """Run one URL through state.main; returns its JSONL record.
+
+    Each URL gets the same wall-clock budget and CancelToken a UI job does,
+    and its job directory is removed once the output has been copied.
+    """
+    record = {"url": url, "output": output_name(url)}
+    start = time.perf_counter()
+    # Each generate() runs in its own task, so only this URL's work sees the token
+    token = CancelToken()
+    current_token.set(token)
+    job_id = None
+    try:
+        job_id = await await_with_timeout(
+            asyncio.ensure_future(generate_llm_txt(url, whole_site=whole_site)), token, timeout,
+        )
+        job_path = job_output_path(job_id)
+        if not os.path.getsize(job_path):
+            raise RuntimeError("No content extracted")
+        shutil.copyfile(job_path, os.path.join(out_dir, record["output"]))
+        stats = TokenStats.load(stats_path(job_path))
+        record.update(status="done", job_id=job_id, bytes=os.path.getsize(job_path),
+                      tokens=stats.totals() if stats else None)
+    except (asyncio.CancelledError, Cancelled):
+        if not token.cancelled:
+            token.cancel("Interrupted")
+            raise
+        record.update(status="failed", error=token.reason)
+    except Exception as e:
+        record.update(status="failed", error=str(e) or type(e).__name__)
+    finally:
+        if job_id is not None:
+            shutil.rmtree(job_dir(job_id), ignore_errors=True)
+    record["seconds"] = round(time.perf_counter() - start, 3)
+    return record
+
+
+async def run(urls, out_dir, parallel, whole_site, results_path):
+    """Generate every URL, at most `parallel` at a time; returns the records."""
+    semaphore = asyncio.Semaphore(parallel)
+
+    async def limited(url):
+        async with semaphore:
+            return await generate(url, out_dir, whole_site)
+
+    records = []
+    async with contextlib.AsyncExitStack() as stack:
+        for lifespan in (browser_pool.lifespan, http_client.lifespan, cleaning_pool.lifespan):
+            await stack.enter_async_context(lifespan())
+        with open(results_path, "a", encoding="utf-8") as results:
+            for task in asyncio.as_completed([limited(url) for url in urls]):
+                record = await task
+                line = json.dumps(record)
+                print(line, flush=True)
+                results.write(line + "\n")
+                results.flush()
+                records.append(record)
+    return records
+
+
+def write_bundle(bundle_path, urls, out_dir, completed):
+    """Concatenate the outputs of completed URLs, in input order, into one file."""
+    with open(bundle_path, "w", encoding="utf-8") as bundle:
+        for url in urls:
+            if url not in completed:
+                continue
+            with open(os.path.join(out_dir, output_name(url)), "r", encoding="utf-8") as f:
+                bundle.write(f'"# Source: {url}"\n{f.read()}\n\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("urls", help="file with one URL per line, or - for stdin")
+    parser.add_argument("--out-dir", default=os.path.join("output", "cli"), help="where outputs and results.jsonl go")
+    parser.add_argument("--parallel", type=int, default=4, help="URLs processed at once")
+    parser.add_argument("--bundle", help="also merge all outputs into this file")
+    parser.add_argument("--resume", action="store_true", help="skip URLs already done in results.jsonl")
+    parser.add_argument("--whole-site", action="store_true", help="crawl every same-site page of each URL")
+    args = parser.parse_args()
+
+    if args.urls == "-":
+        urls = read_urls(sys.stdin)
+    else:
+        with open(args.urls, "r", encoding="utf-8") as f:
+            urls = read_urls(f)
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    results_path = os.path.join(args.out_dir, RESULTS_FILENAME)
+    completed = load_completed(results_path, args.out_dir) if args.resume else set()
+    todo = [url for url in urls if url not in completed]
+    print(f"{len(todo)} to generate, {len(urls) - len(todo)} already done", file=sys.stderr)
+
+    records = asyncio.run(run(todo, args.out_dir, max(1, args.parallel), args.whole_site, results_path))
+    completed.update(record["url"] for record in records if record["status"] == "done")
+    if args.bundle:
+        write_bundle(args.bundle, urls, args.out_dir, completed)
+
+    failed = sum(record["status"] != "done" for record in records)
+    print(f"{len(records) - failed} done, {failed} failed", file=sys.stderr)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
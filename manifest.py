@@ -0,0 +1,149 @@
+import hashlib
+import json
+import os
+from collections import namedtuple
+
+from chunker import section_title
+from classifier import CLASSIFIER
+
+MANIFEST_SUFFIX = ".manifest.json"
+# Bumped whenever entries change shape; manifests of another version are ignored
+MANIFEST_VERSION = 2
+
+# Headings of the sections that differ between two runs, and how many didn't
+SectionDiff = namedtuple("SectionDiff", ["added", "removed", "changed", "unchanged"])
+
+
+def manifest_path(output_path):
+    """Where the section manifest of an llm.txt is written (llm.txt -> llm.txt.manifest.json)."""
+    return f"{output_path}{MANIFEST_SUFFIX}"
+
+
+def content_hash(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def iter_segments(lines):
+    """Split raw lines at every heading line, lazily; yields (hash, lines) per segment.
+
+    The first segment holds whatever precedes the first heading. A cleaned
+    section always starts at one of these boundaries, so it is made of
+    whole segments. Only the segment being read is held in memory.
+    """
+    current = []
+    for line in lines:
+        if current and CLASSIFIER.is_heading(line.strip()):
+            yield content_hash("\n".join(current)), current
+            current = []
+        current.append(line)
+    if current:
+        yield content_hash("\n".join(current)), current
+
+
+def new_entry(section, segment_hashes, duplicates, exact_only):
+    """Manifest record of one section; its byte range and token count are filled in once written.
+
+    `duplicates` is how many lines of its segments were dropped as duplicates,
+    `exact_only` the normalized contact lines it kept (deduplicated exactly,
+    never fuzzily).
+    """
+    return {
+        "heading": section_title(section.split("\n", 1)[0]),
+        "segments": segment_hashes,  # Hashes of the raw segments it was cleaned from
+        "hash": content_hash(section),
+        "duplicates": duplicates,
+        "exact_only": exact_only,
+        "tokens": None,
+        "start": None,  # [start, end) byte offsets in llm.txt
+        "end": None,
+    }
+
+
+def save_manifest(path, entries, preamble, diff=None):
+    """Save section entries, the hashes of the segments before the first section, and the diff against the last run."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": MANIFEST_VERSION, "preamble": preamble, "sections": entries,
+                   "diff": diff._asdict() if diff is not None else None}, f)
+    os.replace(tmp_path, path)
+
+
+def load_manifest(path):
+    """The manifest saved at `path` as a dict, or None if there is none."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def load_diff(output_path):
+    """SectionDiff saved with the output at `output_path`, or None if it wasn't a re-generation."""
+    manifest = load_manifest(manifest_path(output_path))
+    if not manifest or not manifest.get("diff"):
+        return None
+    return SectionDiff(**manifest["diff"])
+
+
+class PreviousOutput:
+    """Sections of an earlier run of the same page, looked up by the raw segments they came from.
+
+    Only the manifest is held in memory; a section's text is read from the
+    earlier llm.txt by its byte range when it is copied.
+    """
+
+    def __init__(self, output_path, manifest):
+        self.file = open(output_path, "rb")
+        self.entries = manifest["sections"]
+        # Every raw segment of the earlier run in order, and the entry that starts at each position
+        self.sequence = list(manifest["preamble"])
+        self.entry_at = {}
+        self._by_first_segment = {}
+        for entry in self.entries:
+            self.entry_at[len(self.sequence)] = entry
+            self.sequence.extend(entry["segments"])
+            self._by_first_segment.setdefault(entry["segments"][0], []).append(entry)
+
+    @classmethod
+    def load(cls, output_path, manifest=None):
+        """The output at `output_path` with its manifest, or None if either is missing."""
+        manifest = load_manifest(manifest or manifest_path(output_path))
+        if not manifest:
+            return None
+        try:
+            return cls(output_path, manifest)
+        except FileNotFoundError:
+            return None
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def starting_with(self, segment_hash):
+        """Earlier entries whose first raw segment has this hash."""
+        return self._by_first_segment.get(segment_hash, ())
+
+    def read(self, entry):
+        """Text of an earlier section."""
+        self.file.seek(entry["start"])
+        return self.file.read(entry["end"] - entry["start"]).decode("utf-8")
+
+
+def diff_sections(old_entries, new_entries):
+    """SectionDiff between two manifests, matching sections by heading."""
+    old = {entry["heading"]: entry["hash"] for entry in old_entries}
+    new = {entry["heading"]: entry["hash"] for entry in new_entries}
+    return SectionDiff(
+        added=[heading for heading in new if heading not in old],
+        removed=[heading for heading in old if heading not in new],
+        changed=[heading for heading in new if heading in old and new[heading] != old[heading]],
+        unchanged=sum(1 for heading in new if old.get(heading) == new[heading]),
+    )
@@ -0,0 +1,102 @@
+import contextlib
+import contextvars
+import threading
+import time
+from collections import OrderedDict
+
+# Stages of a generation, in pipeline order (also the order of the per-job breakdown)
+STAGES = ("reachability", "fetch", "clean", "dedup", "analyze", "render", "total")
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+# Per-job breakdowns kept in memory, oldest dropped first
+JOBS_KEPT = 500
+
+# Job the current task/thread is working for; asyncio.to_thread and new tasks inherit it
+current_job = contextvars.ContextVar("current_job", default=None)
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram with one label."""
+
+    def __init__(self, name, help_text, label, buckets=BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = buckets
+        self._series = {}  # label value -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, label_value, value):
+        series = self._series.get(label_value)
+        if series is None:
+            series = self._series[label_value] = [0] * (len(self.buckets) + 1) + [0.0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+        series[-2] += 1
+        series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for label_value, series in sorted(self._series.items()):
+            label = f'{self.label}="{label_value}"'
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {series[-2]}')
+            lines.append(f"{self.name}_sum{{{label}}} {series[-1]}")
+            lines.append(f"{self.name}_count{{{label}}} {series[-2]}")
+        return "\n".join(lines)
+
+
+class StageMetrics:
+    """Per-stage timings of generations: process-wide histograms plus a breakdown per job.
+
+    Time a stage with `with metrics.span("clean"):`. The job is taken from
+    `current_job` unless given, so code deep in the pipeline needn't know it.
+    """
+
+    def __init__(self):
+        self.histogram = Histogram("web2llm_stage_seconds", "Time spent per generation stage.", "stage")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds, job_id=None):
+        job_id = job_id or current_job.get()
+        with self._lock:
+            self.histogram.observe(stage, seconds)
+            if job_id:
+                breakdown = self._jobs.setdefault(job_id, {})
+                breakdown[stage] = breakdown.get(stage, 0.0) + seconds
+                self._jobs.move_to_end(job_id)
+                while len(self._jobs) > JOBS_KEPT:
+                    self._jobs.popitem(last=False)
+
+    @contextlib.contextmanager
+    def span(self, stage, job_id=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start, job_id)
+
+    @contextlib.contextmanager
+    def job(self, job_id):
+        """Attribute spans in this block (and tasks/threads it starts) to `job_id`."""
+        token = current_job.set(job_id)
+        try:
+            yield
+        finally:
+            current_job.reset(token)
+
+    def breakdown(self, job_id):
+        """Seconds per stage for `job_id`, in pipeline order."""
+        with self._lock:
+            breakdown = dict(self._jobs.get(job_id, {}))
+        return {stage: breakdown[stage] for stage in STAGES if stage in breakdown}
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            return self.histogram.render() + "\n"
+
+
+# Shared by every job in the process
+metrics = StageMetrics()
@@ -0,0 +1,207 @@
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections import Counter
+
+import httpx
+
+from crawler import canonicalize_url
+from http_client import get_client
+from manifest import manifest_path
+from workspace import OUTPUT_DIR
+
+CACHE_DIR = os.path.join(OUTPUT_DIR, "cache")
+CACHE_MAX_BYTES = int(os.getenv("WEB2LLM_CACHE_MAX_MB", "200")) * 1024 * 1024
+# Hit/miss counts are written out with the next store(), or after this many revalidations
+COUNTS_SAVED_EVERY = 50
+
+
+class Revalidation:
+    """Outcome of checking a URL against the cache.
+
+    `hit` means the cached llm.txt is still good. On a miss, `response` is
+    the fresh 200 response (if any) so the caller doesn't fetch it again.
+    """
+
+    def __init__(self, url, hit=False, response=None):
+        self.url = url
+        self.hit = hit
+        self.response = response
+
+
+class PageCache:
+    """On-disk cache of fetched pages and the llm.txt they produced.
+
+    Blobs are stored once under their SHA-256; index.json maps canonical
+    URLs to blob hashes and the ETag/Last-Modified validators used for
+    conditional GETs. Least recently used entries are evicted once the
+    blobs exceed `max_bytes`. store() does file work and must run off the
+    event loop; the index is only written from worker threads.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._index_path = os.path.join(cache_dir, "index.json")
+        self._index = None
+        self._unsaved_counts = 0
+        # Held while the index is changed by store() or written out
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._index is None:
+            try:
+                with open(self._index_path, "r", encoding="utf-8") as f:
+                    self._index = json.load(f)
+            except (FileNotFoundError, ValueError):
+                self._index = {"entries": {}, "hits": 0, "misses": 0}
+        return self._index
+
+    def _save(self):
+        self._unsaved_counts = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{self._index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, self._index_path)
+
+    @property
+    def hits(self):
+        return self._load()["hits"]
+
+    @property
+    def misses(self):
+        return self._load()["misses"]
+
+    async def _count(self, hit):
+        self._load()["hits" if hit else "misses"] += 1
+        self._unsaved_counts += 1
+        if self._unsaved_counts >= COUNTS_SAVED_EVERY:
+            await asyncio.to_thread(self._save_locked)
+
+    def _save_locked(self):
+        with self._lock:
+            self._save()
+
+    def _blob_path(self, digest):
+        return os.path.join(self.cache_dir, "blobs", digest[:2], digest)
+
+    def _put_blob(self, data):
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return digest
+
+    async def revalidate(self, url):
+        """Conditional GET for `url` against what the cache holds."""
+        key = canonicalize_url(url)
+        entry = self._load()["entries"].get(key)
+        if entry and not os.path.exists(self._blob_path(entry["cleaned"])):
+            entry = None
+
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+        try:
+            response = await get_client().get(url, headers=headers)
+        except httpx.HTTPError:
+            response = None
+
+        hit = False
+        if entry and response is not None:
+            if response.status_code == 304:
+                hit = True
+            elif response.status_code == 200:
+                hit = hashlib.sha256(response.content).hexdigest() == entry["raw"]
+
+        if hit:
+            entry["last_used"] = time.time()
+        await self._count(hit)
+        fresh = response if response is not None and response.status_code == 200 else None
+        return Revalidation(key, hit=hit, response=fresh)
+
+    def copy_cleaned(self, revalidation, dest_path):
+        """Write the cached llm.txt for a hit to `dest_path`."""
+        entry = self._load()["entries"][revalidation.url]
+        shutil.copyfile(self._blob_path(entry["cleaned"]), dest_path)
+
+    def previous(self, revalidation):
+        """(llm.txt, manifest) paths of the cached output for a miss whose page has changed, or None."""
+        entry = self._load()["entries"].get(revalidation.url)
+        if not entry or not entry.get("manifest"):
+            return None
+        paths = (self._blob_path(entry["cleaned"]), self._blob_path(entry["manifest"]))
+        return paths if all(os.path.exists(path) for path in paths) else None
+
+    def store(self, revalidation, cleaned_path):
+        """Remember the fetched page and its cleaned output (and section manifest) after a miss.
+
+        Reads and writes whole files; call it in a worker thread.
+        """
+        response = revalidation.response
+        if response is None:
+            return
+        with open(cleaned_path, "rb") as f:
+            cleaned = f.read()
+        try:
+            with open(manifest_path(cleaned_path), "rb") as f:
+                manifest = self._put_blob(f.read())
+        except FileNotFoundError:
+            manifest = None
+        entry = {
+            "raw": self._put_blob(response.content),
+            "cleaned": self._put_blob(cleaned),
+            "manifest": manifest,
+            "etag": response.headers.get("etag"),
+            "last_modified": response.headers.get("last-modified"),
+            "last_used": time.time(),
+        }
+        with self._lock:
+            self._load()["entries"][revalidation.url] = entry
+            self._evict()
+            self._save()
+
+    def _evict(self):
+        entries = self._load()["entries"]
+        # Blobs are shared between entries; one is deleted once nothing refers to it
+        references = Counter(digest for entry in entries.values() for digest in _digests(entry))
+        sizes = {}
+        for digest in references:
+            path = self._blob_path(digest)
+            sizes[digest] = os.path.getsize(path) if os.path.exists(path) else 0
+
+        total = sum(sizes.values())
+        for key in sorted(entries, key=lambda k: entries[k]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            for digest in _digests(entries.pop(key)):
+                references[digest] -= 1
+                if references[digest]:
+                    continue
+                del references[digest]
+                total -= sizes.pop(digest)
+                try:
+                    os.remove(self._blob_path(digest))
+                except FileNotFoundError:
+                    pass
+
+
+def _digests(entry):
+    """Blobs an index entry refers to (entries from before manifests have none)."""
+    return [digest for digest in (entry["raw"], entry["cleaned"], entry.get("manifest")) if digest]
+
+
+# Shared by every job in the process
+page_cache = PageCache()
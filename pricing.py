@@ -0,0 +1,153 @@
+import asyncio
+import contextlib
+import json
+import os
+import time
+from collections import namedtuple
+
+import httpx
+
+from http_client import get_client
+from resources import tiktoken_encoding_names
+from workspace import OUTPUT_DIR
+
+RATE_URL = os.getenv("WEB2LLM_RATE_URL", "https://api.exchangerate.host/convert?from=USD&to=INR")
+RATE_REFRESH_SECONDS = float(os.getenv("WEB2LLM_RATE_REFRESH", str(60 * 60)))
+RATE_PATH = os.path.join(OUTPUT_DIR, "rates.json")
+RATE_TIMEOUT = 5.0
+# Retry sooner than the normal interval after a failed refresh
+RETRY_SECONDS = 60.0
+INR_FALLBACK_RATE = 83.0
+
+# JSON file overriding the price table: {"model": {"encoding": "...", "usd_per_1k": 0.01}}
+PRICES_PATH = os.getenv("WEB2LLM_PRICES")
+
+Model = namedtuple("Model", ["name", "encoding", "usd_per_1k"])
+
+# USD per 1K input tokens, and the tiktoken encoding each model counts with
+DEFAULT_PRICES = {
+    "gpt-4-turbo": ("cl100k_base", 0.01),
+    "gpt-3.5-turbo": ("cl100k_base", 0.0005),
+    "text-embedding-3-small": ("cl100k_base", 0.00002),
+    "text-embedding-3-large": ("cl100k_base", 0.00013),
+    "gpt-4o": ("o200k_base", 0.0025),
+    "gpt-4o-mini": ("o200k_base", 0.00015),
+}
+DEFAULT_MODEL = "gpt-4-turbo"
+
+
+def load_price_table(path=PRICES_PATH):
+    """Models by name: the defaults, overridden/extended by the JSON file at `path`.
+
+    Entries naming an encoding tiktoken can't load are skipped with an error.
+    """
+    table = {name: Model(name, encoding, price) for name, (encoding, price) in DEFAULT_PRICES.items()}
+    if path:
+        known = tiktoken_encoding_names()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for name, entry in json.load(f).items():
+                    if entry["encoding"] not in known:
+                        print(f"Error: price table {path}: {name} uses unknown encoding {entry['encoding']!r}, "
+                              f"skipped (known: {', '.join(known)})")
+                        continue
+                    table[name] = Model(name, entry["encoding"], float(entry["usd_per_1k"]))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Error: could not read price table {path}: {e}")
+    return table
+
+
+MODELS = load_price_table()
+
+
+def encodings(models=None):
+    """Distinct encodings needed to price `models` (default: every model), in table order."""
+    models = MODELS.values() if models is None else models
+    return list(dict.fromkeys(model.encoding for model in models))
+
+
+class RateService:
+    """USD→INR rate kept fresh by a background task.
+
+    Readers only ever see the last known rate (`rate`), so the request path
+    never waits on the network. The rate is saved to `path` after every
+    successful refresh and read back on start, so an offline restart keeps
+    the last real rate instead of the hard-coded fallback.
+    """
+
+    def __init__(self, url=RATE_URL, path=RATE_PATH, refresh_seconds=RATE_REFRESH_SECONDS,
+                 fallback=INR_FALLBACK_RATE):
+        self.url = url
+        self.path = path
+        self.refresh_seconds = refresh_seconds
+        self.fallback = fallback
+        self.fetched_at = 0.0
+        self._rate = None
+
+    @property
+    def rate(self):
+        if self._rate is None:
+            self._load()
+        return self._rate
+
+    @property
+    def age(self):
+        """Seconds since the rate was fetched (inf if never)."""
+        return time.time() - self.fetched_at if self.fetched_at else float("inf")
+
+    def _load(self):
+        self._rate = self.fallback
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+            self._rate = float(saved["rate"])
+            self.fetched_at = float(saved["fetched_at"])
+        except (FileNotFoundError, ValueError, KeyError, TypeError):
+            pass
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"rate": self._rate, "fetched_at": self.fetched_at}, f)
+        os.replace(tmp_path, self.path)
+
+    async def refresh(self):
+        """Fetch the current rate; returns True if it was updated."""
+        try:
+            response = await get_client().get(self.url, timeout=RATE_TIMEOUT)
+            response.raise_for_status()
+            rate = float(response.json()["result"])
+        except (httpx.HTTPError, ValueError, KeyError, TypeError) as e:
+            print(f"Error: could not refresh exchange rate: {e}")
+            return False
+        if rate <= 0:
+            return False
+        self._rate = rate
+        self.fetched_at = time.time()
+        self._save()
+        return True
+
+    async def run(self):
+        """Refresh forever, starting as soon as the saved rate is due."""
+        if self._rate is None:
+            self._load()  # The saved rate's time decides when the first refresh is due
+        delay = max(0.0, self.refresh_seconds - self.age)
+        while True:
+            await asyncio.sleep(delay)
+            delay = self.refresh_seconds if await self.refresh() else RETRY_SECONDS
+
+    @contextlib.asynccontextmanager
+    async def lifespan(self):
+        """App lifespan hook: refresh the rate in the background while the server runs."""
+        task = asyncio.create_task(self.run())
+        try:
+            yield
+        finally:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+
+# Shared by every request in the process
+inr_rates = RateService()
@@ -0,0 +1,119 @@
+import contextlib
+import os
+import threading
+import time
+
+# Resources loaded in the background once the server is up (comma separated names)
+PREWARM = [name for name in os.getenv("WEB2LLM_PREWARM", "cl100k_base").split(",") if name]
+
+
+class LazyResource:
+    """A model or encoder that is only loaded the first time it is used."""
+
+    def __init__(self, name, loader):
+        self.name = name
+        self.loader = loader
+        self.load_seconds = None
+        self._value = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self.load_seconds is not None
+
+    def get(self):
+        if self.load_seconds is None:
+            with self._lock:
+                if self.load_seconds is None:
+                    start = time.perf_counter()
+                    self._value = self.loader()
+                    self.load_seconds = time.perf_counter() - start
+                    print(f"[✔] Loaded {self.name} in {self.load_seconds:.2f}s")
+        return self._value
+
+
+class ResourceRegistry:
+    """Named lazy resources shared by the whole process.
+
+    `fallback(name)` returns a loader for a name that was never registered,
+    or None if there is no such resource; it is registered on first use.
+    """
+
+    def __init__(self, fallback=None):
+        self.fallback = fallback
+        self._resources = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, loader):
+        self._resources[name] = LazyResource(name, loader)
+
+    def get(self, name):
+        resource = self._resources.get(name)
+        if resource is None:
+            loader = self.fallback(name) if self.fallback else None
+            if loader is None:
+                raise KeyError(f"Unknown resource: {name}")
+            with self._lock:
+                resource = self._resources.setdefault(name, LazyResource(name, loader))
+        return resource.get()
+
+    def timings(self):
+        """Seconds each loaded resource took to load, by name."""
+        return {name: r.load_seconds for name, r in self._resources.items() if r.loaded}
+
+    def prewarm(self, names=None):
+        """Load resources on a background thread; returns the thread."""
+        names = PREWARM if names is None else names
+
+        def load_all():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    print(f"Error: failed to pre-warm {name}: {e}")
+
+        thread = threading.Thread(target=load_all, name="prewarm", daemon=True)
+        thread.start()
+        return thread
+
+    @contextlib.asynccontextmanager
+    async def lifespan(self):
+        """App lifespan hook: pre-warm without delaying server startup."""
+        self.prewarm()
+        yield
+
+
+def _load_spacy():
+    import spacy
+    return spacy.load("en_core_web_sm")
+
+
+def _tiktoken_loader(encoding_name):
+    def load():
+        import tiktoken
+        return tiktoken.get_encoding(encoding_name)
+    return load
+
+
+def tiktoken_encoding_names():
+    """Names of the encodings tiktoken can load (empty if it isn't installed)."""
+    try:
+        import tiktoken
+    except ImportError:
+        return []
+    return tiktoken.list_encoding_names()
+
+
+def _any_tiktoken_encoding(name):
+    return _tiktoken_loader(name) if name in tiktoken_encoding_names() else None
+
+
+registry = ResourceRegistry(fallback=_any_tiktoken_encoding)
+registry.register("en_core_web_sm", _load_spacy)
+for _encoding_name in ("cl100k_base", "o200k_base"):
+    registry.register(_encoding_name, _tiktoken_loader(_encoding_name))
+
+
+def get_encoding(name="cl100k_base"):
+    """Shared tiktoken encoder, loaded on first use."""
+    return registry.get(name)
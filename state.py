@@ -1,249 +1,176 @@
 import sys
 import os
-import re
-import spacy
-import textdistance
-
-# Load spaCy model
-nlp = spacy.load("en_core_web_sm")
-
-def normalize_line(line):
-    """Normalize a line by lowercasing, removing links, and collapsing spaces."""
-    line = re.sub(r'\[([^\]]+)\]\([^)]+\)', r'\1', line)
-    line = re.sub(r'[^\w\s]', '', line.lower()).strip()
-    return line
-
-def is_image_line(line):
-    """Check if line contains an image markdown or image-related content."""
-    return (re.search(r'!\[.*?\]\(.*?\)', line) is not None or
-            any(term in line.lower() for term in ['image:', 'img:', 'picture:', 'photo:']))
-
-def is_ui_junk(line):
-    """Check if line contains UI elements, icons, or non-content elements."""
-    line_lower = line.lower()
-    
-    # Common UI/icon terms
-    ui_terms = [
-        'icon', 'avatar', 'logo', 'button', 'nav', 'navbar', 'menu', 
-        'hamburger', 'dropdown', 'toggle', 'footer', 'header', 'banner',
-        'sidebar', 'widget', 'chatbot', 'cookie', 'notification', 'alert',
-        'tooltip', 'badge', 'card', 'carousel', 'slider', 'modal', 'popup',
-        'tab', 'accordion', 'breadcrumb', 'pagination', 'loader', 'spinner',
-        'progress', 'checkbox', 'radio', 'switch', 'input', 'textarea',
-        'select', 'form', 'label', 'field', 'close', 'minimize', 'maximize',
-        'expand', 'collapse', 'zoom', 'scroll', 'drag', 'drop', 'overlay',
-        'backdrop', 'splash', 'placeholder', 'toolbar', 'ribbon', 'fab',
-        'stepper', 'chip', 'divider', 'snackbar', 'toast', 'dialog'
-    ]
-    
-    # File extensions to exclude
-    file_extensions = [
-        r'\.svg',   r'\.gif',  r'\.ico',   r'\.bmp',   r'\.tiff',  r'\.eps',   r'\.ai',    r'\.psd',
-        r'\.jpg',   r'\.jpeg', r'\.png',   r'\.webp',  r'\.avif',  r'\.heic',  r'\.raw',   r'\.cr2',
-        r'\.mp4',   r'\.mov',  r'\.avi',   r'\.mkv',   r'\.flv',   r'\.wmv',   r'\.mpeg',  r'\.3gp',
-        r'\.mp3',   r'\.wav',  r'\.aac',   r'\.ogg',   r'\.flac',  r'\.m4a',   r'\.wma',   r'\.amr',
-        r'\.pdf',   r'\.docx', r'\.xlsx',  r'\.pptx',  r'\.odt',   r'\.rtf',   r'\.tex',   r'\.csv',
-        r'\.ttf',   r'\.otf',  r'\.woff',  r'\.woff2', r'\.eot',   r'\.fon',   r'\.fnt',
-        r'\.zip',   r'\.rar',  r'\.7z',    r'\.tar',   r'\.gz',    r'\.bz2',   r'\.xz',
-        r'\.exe',   r'\.dll',  r'\.msi',   r'\.bat',   r'\.cmd',   r'\.sh',    r'\.pyc',
-        r'\.db',    r'\.sqlite', r'\.sql', r'\.bak',   r'\.log',   r'\.tmp',   r'\.swp',
-        r'\.torrent', r'\.iso', r'\.img',  r'\.vmdk',  r'\.vdi',   r'\.ova',   r'\.apk',
-        r'\.ipa',   r'\.jar',  r'\.class', r'\.java',  r'\.cs',    r'\.vb',    r'\.rb',
-        r'\.php',   r'\.asp',  r'\.jsp',   r'\.aspx',  r'\.cgi',   r'\.pl',    r'\.lua'
-    ]
-    
-    # Patterns that indicate non-content elements
-    patterns = [
-        r'\b\d+x\d+\b',  # Image dimensions (e.g., 100x100)
-        r'\b\d+px\b',    # Pixel sizes
-        r'#[0-9a-f]{3,6}',  # Hex colors
-        r'\b(rgb|rgba|hsl|hsla)\([^)]+\)',  # Color functions
-        r'\b(click|tap|hover|press|select|swipe|pinch)\b',
-        r'\b(loading|spinner|progress)\b',
-        r'©\s*\d{4}',  # Copyright
-        r'all rights reserved',
-        r'terms of service|privacy policy',
-        r'cookie consent',
-        r'[\u25A0-\u25FF\u2600-\u26FF\u2700-\u27BF]'  # Common Unicode symbols/icons
-    ]
-    
-    # Check for UI terms
-    if any(term in line_lower for term in ui_terms):
-        return True
-    
-    # Check for file extensions
-    if any(re.search(ext, line_lower) for ext in file_extensions):
-        return True
-    
-    # Check for patterns
-    if any(re.search(pattern, line_lower) for pattern in patterns):
-        return True
-    
-    # Check for empty or very short lines
-    if len(line.strip()) < 3:
-        return True
-    
-    return False
-
-def is_contact_line(line):
-    """Check if line contains contact information."""
-    contact_patterns = [
-        r'email\s*:', 
-        r'phone\s*:', 
-        r'mobile\s*:', 
-        r'tel:', 
-        r'address\s*:',
-        r'http[s]?://',
-        r'\b(contact|connect|reach|follow)\b',
-        r'linkedin\.com|facebook\.com|instagram\.com|twitter\.com',
-        r'github\.com|youtube\.com|whatsapp|telegram',
-        r'\b[\w\.-]+@[\w\.-]+\.\w+\b'  # Email regex
-    ]
-    
-    return any(re.search(pattern, line, re.IGNORECASE) for pattern in contact_patterns)
-
-def needs_newline_after(current_line, next_line):
-    """Determine if we need a newline after current line."""
-    if is_image_line(current_line):
-        return True
-    if current_line.startswith('#') and not next_line.startswith('#'):
-        return True
-    if ('address' in current_line.lower() and 
-        any(x in next_line.lower() for x in ['phone', 'mobile', 'email'])):
-        return True
-    return False
-
-def split_contact_lines(line):
-    """Split combined contact information into separate lines."""
-    # Split different contact info types
-    line = re.sub(r'([^\s])(Email\s*:)', r'\1\n\2', line, flags=re.IGNORECASE)
-    line = re.sub(r'(Email\s*:[^\n]+)(http[s]?://)', r'\1\n\2', line, flags=re.IGNORECASE)
-    line = re.sub(r'(\bPhone\b[^\n]+)(\bMobile\b)', r'\1\n\2', line, flags=re.IGNORECASE)
-    line = re.sub(r'(\bAddress\b[^\n]+)(\bEmail\b)', r'\1\n\2', line, flags=re.IGNORECASE)
-    
-    # Split multiple URLs
-    line = re.sub(r'(https?://[^\s]+)\s+(https?://)', r'\1\n\2', line)
-    
-    return line
-
-def clean_and_restructure_file(file_path):
-    """Cleans and restructures a text file with proper formatting."""
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-    except FileNotFoundError:
-        print(f"Error: File '{file_path}' not found.")
-        return
-
-    seen_exact = set()
-    seen_normalized = {}
-    cleaned_lines = []
-    current_section = None
-    section_content = []
-
-    for i, line in enumerate(lines):
-        original_line = line.strip()
-        line = line.strip()
-
-        # Skip empty or junk lines
-        if not line or is_ui_junk(line):
-            continue
-
-        # Handle social media links
-        if is_contact_line(line):
-            line = split_contact_lines(line)
-            for sub_line in line.split('\n'):
-                if sub_line.strip() and not is_ui_junk(sub_line):
-                    normalized = normalize_line(sub_line)
-                    if normalized not in seen_exact:
-                        seen_exact.add(normalized)
-                        section_content.append(sub_line.strip())
-            continue
-
-        # Skip images and non-content elements
-        if is_image_line(line) or is_ui_junk(line):
-            continue
-
-        # Deduplication with fuzzy matching
-        normalized = normalize_line(line)
-        if normalized in seen_exact:
-            continue
-            
-        duplicate_found = False
-        for seen_norm in seen_normalized:
-            if textdistance.jaro_winkler.normalized_similarity(seen_norm, normalized) > 0.92:
-                duplicate_found = True
-                break
-        if duplicate_found:
-            continue
-
-        seen_exact.add(normalized)
-        seen_normalized[normalized] = line
-
-        # Restructure Content
-        if re.search(r'^#+\s+', line):
-            if current_section:
-                cleaned_lines.append(format_section(current_section, section_content))
-            current_section = line.strip("# ").strip()
-            section_content = []
-            continue
-
-        section_content.append(original_line)
-
-    if current_section:
-        cleaned_lines.append(format_section(current_section, section_content))
-
-    # Process lines to add newlines where needed
-    final_output = []
-    for i in range(len(cleaned_lines)):
-        line = cleaned_lines[i]
-        final_output.append(line)
-        
-        # Check if we need a newline after this line
-        if i < len(cleaned_lines) - 1:
-            next_line = cleaned_lines[i+1]
-            if needs_newline_after(line, next_line):
-                final_output.append('""')  # Empty quoted line for newline
-
-    try:
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(final_output))
-    except IOError:
-        print(f"Error: Unable to write to file '{file_path}'.")
-        return
-
-    print(f"[✔] Cleaned and restructured file: {file_path} | Lines kept: {len(final_output)}")
-
-def format_section(section_title, section_content):
-    """Formats a section with proper structure and quotes."""
-    formatted = [f'"# {section_title}"']
-    for i, item in enumerate(section_content):
-        # Skip if it's UI junk that slipped through
-        if is_ui_junk(item):
-            continue
-            
-        bullet = "- " if not item.startswith('- ') else ""
-        formatted_line = f'"{bullet}{item}"'
-        formatted.append(formatted_line)
-        
-        # Add newline after image or before contact info
-        if i < len(section_content) - 1:
-            next_item = section_content[i+1]
-            if (is_image_line(item) or 
-                ('address' in item.lower() and 
-                 any(x in next_item.lower() for x in ['phone', 'mobile', 'email']))):
-                formatted.append('""')
-    
-    return '\n'.join(formatted)
+import asyncio
+import shutil
+from boilerplate import BoilerplateModel
+from browser_pool import browser_pool
+from cancellation import cancel_current
+from analysis import new_stats, stats_path
+from chunker import Chunker, chunk_file, chunks_path
+from cleaner import (
+    SectionWriter, StreamingCleaner, clean_and_restructure_file, format_section,
+    is_contact_line, is_image_line, is_ui_junk, needs_newline_after, normalize_line,
+    split_contact_lines,
+)
+from clean_pool import PageMerger, cleaning_pool
+from crawler import SiteCrawler
+from fetcher import fetch_static
+from page_cache import page_cache
+from jobs import CLEANING, JobQueue
+from metrics import metrics
+from workspace import OUTPUT_DIR, OUTPUT_FILENAME, new_job_id, job_dir, job_output_path
 
 engine_path = os.path.abspath(os.path.join("engine", "xengine"))
 sys.path.insert(0, engine_path)
 
 from Cengine import xengine
 
-async def main(link):
-    await xengine(link)
-    clean_and_restructure_file("output/llm.txt")
+# xengine always writes its result here, whoever asked for it
+XENGINE_OUTPUT = os.path.join(OUTPUT_DIR, OUTPUT_FILENAME)
+_xengine_lock = asyncio.Lock()
+
+# Per-stage budgets, in seconds: fetching one page, and cleaning a single-page result
+FETCH_TIMEOUT = float(os.getenv("WEB2LLM_FETCH_TIMEOUT", "90"))
+CLEAN_TIMEOUT = float(os.getenv("WEB2LLM_CLEAN_TIMEOUT", "300"))
+
+async def fetch_page(link, crawler=None, response=None):
+    """Render `link` and return the raw markdown it produced.
+
+    Server-rendered pages are fetched over plain HTTP and converted
+    locally. Everything else is rendered by the injected Crawl4AI `crawler`
+    if given, otherwise by a warm browser from the shared pool; xengine (a
+    cold browser per call) is the fallback when the pool is unavailable.
+    `response` is an already fetched httpx response for `link`, if any.
+    Raises asyncio.TimeoutError after FETCH_TIMEOUT seconds.
+    """
+    with metrics.span("fetch"):
+        try:
+            return await asyncio.wait_for(_render(link, crawler, response), FETCH_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise asyncio.TimeoutError(f"Fetching {link} took over {FETCH_TIMEOUT:g}s") from None
+
+async def _render(link, crawler, response):
+    if crawler is None:
+        markdown = await fetch_static(link, response)
+        if markdown is not None:
+            return markdown
+
+    if crawler is not None or browser_pool.available:
+        return await browser_pool.render(link, crawler)
+
+    # xengine's output file is shared, so read it back before the next crawl starts
+    async with _xengine_lock:
+        await xengine(link)
+        with open(XENGINE_OUTPUT, 'r', encoding='utf-8') as f:
+            return f.read()
+
+async def crawl_site(link, job_id, on_status=None, progress=None, **limits):
+    """Crawl the whole site behind `link` into the job's llm.txt.
+
+    Pages are cleaned on the clean_pool workers as they arrive and appended
+    to the output in arrival order. Lines repeated on most pages (navigation,
+    footers) are stripped as boilerplate, then duplicates are removed across
+    pages. `progress` (jobs.Progress) follows the crawl and cleaning as
+    they happen. `limits` go to crawler.SiteCrawler.
+    """
+    output_path = job_output_path(job_id, create=True)
+    crawler = SiteCrawler(link, fetch_page, **limits)
+    cleaner = StreamingCleaner()
+
+    stats = new_stats()
+    boilerplate = BoilerplateModel()
+    merger = PageMerger(cleaner, cleaning_pool, boilerplate)
+    with open(output_path, 'w', encoding='utf-8') as f, \
+            open(chunks_path(output_path), 'w', encoding='utf-8') as chunks_file:
+        chunker = Chunker(chunks_file, encoding_name=stats.encodings[0]) if stats else None
+        writer = SectionWriter(f, stats, chunker)
+        if progress is not None:
+            progress.watch(crawler=crawler, cleaner=cleaner, writer=writer, boilerplate=boilerplate)
+
+        def write(sections):
+            for section, url in sections:
+                writer.write(section, url)
+            f.flush()
+
+        async def write_merged(wait=False):
+            sections = await merger.merge(wait)
+            if sections:
+                # The writer tokenizes and chunks every section, so it runs off the event loop
+                await asyncio.to_thread(write, sections)
+
+        try:
+            async for url, markdown in crawler.crawl():
+                merger.submit(markdown, url)
+                await write_merged()
+            await write_merged(wait=True)
+        finally:
+            merger.cancel()
+        # Flushes the last section to the token stats and chunker
+        await asyncio.to_thread(writer.close)
+    metrics.record("dedup", cleaner.dedup_seconds)
+    if stats is not None:
+        stats.save(stats_path(output_path))
+
+    if not crawler.pages_fetched:
+        raise RuntimeError(f"No pages could be crawled from {link}")
+    print(f"[✔] Crawled {crawler.pages_fetched} pages ({crawler.pages_failed} failed, "
+          f"{boilerplate.lines_removed} boilerplate lines removed): {output_path}")
+
+async def main(link, job_id=None, on_status=None, whole_site=False, progress=None):
+    """Crawl `link` into the job's own llm.txt and clean it; returns the job id.
+
+    `on_status` is called with the jobs.* status as the job changes stage;
+    `progress` (jobs.Progress) is kept pointed at the work in progress.
+    With `whole_site`, every same-site page reachable from `link` is included.
+    If the job fails, times out or is cancelled, its partial output is deleted.
+    """
+    job_id = job_id or new_job_id()
+    with metrics.job(job_id):
+        try:
+            await _generate(link, job_id, on_status, whole_site, progress)
+        except BaseException as e:
+            # Stop cleaning threads still working for this job before removing their files
+            cancel_current("Cancelled" if isinstance(e, asyncio.CancelledError) else str(e) or type(e).__name__)
+            shutil.rmtree(job_dir(job_id), ignore_errors=True)
+            raise
+    return job_id
+
+async def _generate(link, job_id, on_status, whole_site, progress):
+    output_path = job_output_path(job_id, create=True)
+
+    if whole_site:
+        await crawl_site(link, job_id, on_status, progress)
+        return
+
+    # Unchanged since last time (304 or identical body): reuse the cleaned output
+    revalidation = await page_cache.revalidate(link)
+    if revalidation.hit:
+        await asyncio.to_thread(page_cache.copy_cleaned, revalidation, output_path)
+        await asyncio.to_thread(chunk_file, output_path, link)
+        return
+
+    # The page changed since it was cached: only its changed sections need cleaning
+    previous = page_cache.previous(revalidation)
+    markdown = await fetch_page(link, response=revalidation.response)
+    if progress is not None:
+        progress.pages_fetched = 1
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(markdown)
+
+    if on_status:
+        on_status(CLEANING)
+    with metrics.span("clean"):
+        try:
+            await asyncio.wait_for(
+                asyncio.to_thread(clean_and_restructure_file, output_path, None, link, progress, previous),
+                CLEAN_TIMEOUT,
+            )
+        except asyncio.TimeoutError:
+            raise asyncio.TimeoutError(f"Cleaning took over {CLEAN_TIMEOUT:g}s") from None
+    await asyncio.to_thread(page_cache.store, revalidation, output_path)
+
+# Process-wide queue every UI submission goes through
+job_queue = JobQueue(main)
 
 
 # import os
@@ -0,0 +1,112 @@
+"""The q-gram dedup index keeps the same lines as brute force and the original cleaner loop.
+
+Run from the repo root:  python -m pytest tests
+"""
+import contextlib
+import io
+import os
+import re
+import sys
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from bench_cleaning import FIXTURE_PATH, recorded_lines
+from cleaner import (
+    clean_and_restructure_file, format_section, is_contact_line, is_image_line, is_ui_junk,
+    needs_newline_after, normalize_line, split_contact_lines,
+)
+from dedup import is_near_duplicate, make_index
+
+SAMPLE_OUTPUT_PATH = os.path.join(ROOT, "output", "llm.txt")
+
+
+def baseline_clean(lines):
+    """The cleaner loop as it was before the dedup index, comparing against every kept line."""
+    seen_exact = set()
+    seen_normalized = []
+    cleaned = []
+    current_section = None
+    section_content = []
+    for line in lines:
+        line = line.strip()
+        if not line or is_ui_junk(line):
+            continue
+        if is_contact_line(line):
+            for sub_line in split_contact_lines(line).split('\n'):
+                if sub_line.strip() and not is_ui_junk(sub_line):
+                    normalized = normalize_line(sub_line)
+                    if normalized not in seen_exact:
+                        seen_exact.add(normalized)
+                        section_content.append(sub_line.strip())
+            continue
+        if is_image_line(line):
+            continue
+        normalized = normalize_line(line)
+        if normalized in seen_exact:
+            continue
+        if any(is_near_duplicate(seen, normalized) for seen in seen_normalized):
+            continue
+        seen_exact.add(normalized)
+        seen_normalized.append(normalized)
+        if re.search(r'^#+\s+', line):
+            if current_section:
+                cleaned.append(format_section(current_section, section_content))
+            current_section = line.strip("# ").strip()
+            section_content = []
+            continue
+        section_content.append(line)
+    if current_section:
+        cleaned.append(format_section(current_section, section_content))
+
+    output = []
+    for i, section in enumerate(cleaned):
+        output.append(section)
+        if i < len(cleaned) - 1 and needs_newline_after(section, cleaned[i + 1]):
+            output.append('""')
+    return '\n'.join(output)
+
+
+def cleaned_with(kind, lines, tmp_path):
+    path = tmp_path / f"{kind}.txt"
+    path.write_text('\n'.join(lines), encoding="utf-8")
+    with contextlib.redirect_stdout(io.StringIO()):
+        clean_and_restructure_file(str(path), make_index(kind))
+    return path.read_text(encoding="utf-8")
+
+
+def sample_output_lines():
+    # Cleaned output turned back into raw lines: unquoted, without the added bullets
+    with open(SAMPLE_OUTPUT_PATH, "r", encoding="utf-8") as f:
+        return [line.strip().strip('"').removeprefix("- ") for line in f]
+
+
+def fixture_lines():
+    with open(FIXTURE_PATH, "r", encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+@pytest.mark.parametrize("lines", [
+    pytest.param(sample_output_lines(), id="llm.txt"),
+    pytest.param(fixture_lines(), id="sample_page"),
+    pytest.param(recorded_lines(3000), id="recorded-3000"),
+])
+def test_qgram_keeps_the_same_lines(lines, tmp_path):
+    qgram = cleaned_with("qgram", lines, tmp_path)
+    assert qgram == cleaned_with("brute", lines, tmp_path)
+    assert qgram == baseline_clean(lines)
+
+
+def test_qgram_only_skips_comparisons():
+    lines = [normalize_line(line) for line in recorded_lines(3000)]
+    indexes = {kind: make_index(kind) for kind in ("qgram", "brute")}
+    for line in filter(None, lines):
+        found = {kind: index.contains_similar(line) for kind, index in indexes.items()}
+        assert found["qgram"] == found["brute"], line
+        if not found["brute"]:
+            for index in indexes.values():
+                index.add(line)
+    assert indexes["qgram"].comparisons < indexes["brute"].comparisons
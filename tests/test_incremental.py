@@ -0,0 +1,134 @@
+"""Re-cleaning a page against its previous output gives exactly what a full clean gives.
+
+Run from the repo root:  python -m pytest tests
+"""
+import contextlib
+import io
+import os
+import random
+import sys
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from bench_cleaning import FIXTURE_PATH
+from cleaner import clean_and_restructure_file
+from manifest import PreviousOutput, SectionDiff, diff_sections, manifest_path
+
+SECTIONS = [
+    ("Alpha", ["Alpha opens with a sentence about how the product started.",
+               "A second alpha sentence explains who the product is for."]),
+    ("Beta", ["Beta describes the pricing plans available to small teams.",
+              "Every plan includes support from our engineers around the clock."]),
+    ("Gamma", ["Gamma lists the integrations with popular accounting tools.",
+               "Email: hello@example.com | Phone: +1 555 0100"]),
+    ("Delta", ["Delta answers questions about migrating existing customer data.",
+               "Imports usually finish within a single working afternoon."]),
+    ("Epsilon", ["Epsilon closes with the story of our very first customer.",
+                 "They still use the product every day at their bakery."]),
+]
+
+
+def page(sections, preamble=("Intro text shown before the first heading of the page.",)):
+    lines = list(preamble)
+    for heading, body in sections:
+        lines.append(f"# {heading}")
+        lines.extend(body)
+    return "\n".join(lines)
+
+
+def clean(tmp_path, name, text, previous=None):
+    path = tmp_path / f"{name}.txt"
+    path.write_text(text, encoding="utf-8")
+    with contextlib.redirect_stdout(io.StringIO()):
+        diff = clean_and_restructure_file(str(path), None, None, None, previous)
+    return path.read_text(encoding="utf-8"), diff
+
+
+def incremental_and_full(tmp_path, old_text, new_text, monkeypatch):
+    """(incremental output, full output, diff, sections copied) for new_text cleaned against old_text."""
+    clean(tmp_path, "old", old_text)
+    old_path = str(tmp_path / "old.txt")
+    copies = []
+    read = PreviousOutput.read
+    monkeypatch.setattr(PreviousOutput, "read", lambda self, entry: copies.append(entry) or read(self, entry))
+    incremental, diff = clean(tmp_path, "incremental", new_text, (old_path, manifest_path(old_path)))
+    full, _ = clean(tmp_path, "full", new_text)
+    return incremental, full, diff, len(copies)
+
+
+def edited(edit):
+    sections = [(heading, list(body)) for heading, body in SECTIONS]
+    edit(sections)
+    return sections
+
+
+EDITS = {
+    "unchanged": lambda s: None,
+    "inserted section": lambda s: s.insert(2, ("Zeta", ["Zeta is a brand new section about our hiring process."])),
+    "removed section": lambda s: s.pop(1),
+    "changed line": lambda s: s[1][1].append("Annual billing saves two months compared to monthly."),
+    "reordered sections": lambda s: s.insert(0, s.pop(3)),
+    # An earlier copy makes a later line a duplicate, so the later section can't be copied
+    "cross-section duplicate": lambda s: s[0][1].append(SECTIONS[3][1][1]),
+    "cross-section near duplicate": lambda s: s[0][1].append(SECTIONS[3][1][1].replace("afternoon", "afternoons")),
+    # A junk heading doesn't open a section: its paragraph joins the one before
+    "junk heading": lambda s: s[0][1].extend(["# Menu", "A paragraph that must be kept under Alpha."]),
+    "duplicate heading": lambda s: s[0][1].extend(["# Delta", "A line that joins Alpha, as its heading repeats."]),
+    "contact line repeated earlier": lambda s: s[0][1].append("Email: hello@example.com | Phone: +1 555 0199"),
+    "contact line removed": lambda s: s[2][1].pop(),
+}
+
+
+@pytest.mark.parametrize("edit", EDITS.values(), ids=EDITS.keys())
+def test_incremental_matches_full_clean(edit, tmp_path, monkeypatch):
+    incremental, full, _, copies = incremental_and_full(
+        tmp_path, page(SECTIONS), page(edited(edit)), monkeypatch)
+    assert incremental == full
+    assert copies > 0
+
+
+def test_changed_preamble_still_copies_sections(tmp_path, monkeypatch):
+    incremental, full, _, copies = incremental_and_full(
+        tmp_path, page(SECTIONS), page(SECTIONS, preamble=("A different intro line.",)), monkeypatch)
+    assert incremental == full
+    assert copies == len(SECTIONS)
+
+
+def test_random_edits_of_the_sample_page(tmp_path, monkeypatch):
+    with open(FIXTURE_PATH, "r", encoding="utf-8") as f:
+        lines = f.read().split("\n")
+    rng = random.Random(0)
+    copies = 0
+    for trial in range(10):
+        new_lines = list(lines)
+        for _ in range(3):
+            i = rng.randrange(len(new_lines))
+            rng.choice([
+                lambda: new_lines.insert(i, f"A new line about release number {trial}."),
+                lambda: new_lines.insert(i, rng.choice(lines)),
+                lambda: new_lines.pop(i),
+            ])()
+        incremental, full, _, trial_copies = incremental_and_full(
+            tmp_path, "\n".join(lines), "\n".join(new_lines), monkeypatch)
+        assert incremental == full, trial
+        copies += trial_copies
+        monkeypatch.undo()
+    assert copies > 0
+
+
+def test_diff_of_a_regeneration(tmp_path, monkeypatch):
+    new = edited(lambda s: (s[1][1].append("Annual billing saves two months."), s.pop(3),
+                            s.append(("Zeta", ["Zeta is a brand new section about hiring."]))))
+    _, _, diff, _ = incremental_and_full(tmp_path, page(SECTIONS), page(new), monkeypatch)
+    assert diff == SectionDiff(added=["Zeta"], removed=["Delta"], changed=["Beta"], unchanged=3)
+
+
+def test_diff_sections():
+    old = [{"heading": "A", "hash": "1"}, {"heading": "B", "hash": "2"}, {"heading": "C", "hash": "3"}]
+    new = [{"heading": "A", "hash": "1"}, {"heading": "B", "hash": "9"}, {"heading": "D", "hash": "4"}]
+    assert diff_sections(old, new) == SectionDiff(added=["D"], removed=["C"], changed=["B"], unchanged=1)
+    assert diff_sections(old, old) == SectionDiff(added=[], removed=[], changed=[], unchanged=3)
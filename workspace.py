@@ -0,0 +1,54 @@
+import os
+import re
+import shutil
+import time
+import uuid
+
+OUTPUT_DIR = "output"
+JOBS_DIR = os.path.join(OUTPUT_DIR, "jobs")
+OUTPUT_FILENAME = "llm.txt"
+
+_JOB_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+def new_job_id() -> str:
+    """Return a fresh job id (also used in the /results/<job_id> route)."""
+    return uuid.uuid4().hex
+
+
+def is_valid_job_id(job_id: str) -> bool:
+    return bool(job_id) and _JOB_ID_RE.match(job_id) is not None
+
+
+def job_dir(job_id: str, create: bool = False) -> str:
+    """Directory holding everything produced for one job."""
+    # Job ids come back from the URL, so never let them escape JOBS_DIR
+    if not is_valid_job_id(job_id):
+        raise ValueError(f"Invalid job id: {job_id!r}")
+    path = os.path.join(JOBS_DIR, job_id)
+    if create:
+        os.makedirs(path, exist_ok=True)
+    return path
+
+
+def job_output_path(job_id: str, create: bool = False) -> str:
+    """Path of the job's llm.txt."""
+    return os.path.join(job_dir(job_id, create=create), OUTPUT_FILENAME)
+
+
+def prune_job_dirs(keep, max_age, active=()):
+    """Delete job directories beyond the `keep` newest or untouched for `max_age` seconds.
+
+    Jobs whose id is in `active` are left alone. Returns how many were deleted.
+    """
+    try:
+        entries = [entry for entry in os.scandir(JOBS_DIR)
+                   if entry.is_dir() and is_valid_job_id(entry.name) and entry.name not in active]
+    except FileNotFoundError:
+        return 0
+    entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    cutoff = time.time() - max_age
+    expired = [entry for i, entry in enumerate(entries) if i >= keep or entry.stat().st_mtime < cutoff]
+    for entry in expired:
+        shutil.rmtree(entry.path, ignore_errors=True)
+    return len(expired)